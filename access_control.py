@@ -0,0 +1,118 @@
+"""
+Lista de emails autorizados persistida em authorized_emails.json
+
+O arquivo pode ser editado à mão ou por outro worker: a cada consulta o store
+confere o arquivo com um stat (no máximo uma vez a cada CHECK_INTERVAL
+segundos) e recarrega quando mtime/tamanho/inode mudam.
+
+Alterações (``update``) relêem o arquivo e gravam com escrita atômica (arquivo
+temporário + fsync + os.replace) sob um lock de arquivo, então dois workers
+adicionando emails ao mesmo tempo não perdem nenhuma alteração. A escrita é
+bloqueante: as rotas async chamam ``update`` via asyncio.to_thread.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, só o lock entre threads deste processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 1.0
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class AccessControlStore:
+    """Emails autorizados: lista na grafia original (admin) + conjunto normalizado (consultas)."""
+
+    def __init__(self, path: Path, on_revoke: Optional[Callable[[Set[str]], None]] = None):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.on_revoke = on_revoke  # Recebe os emails (normalizados) que perderam acesso
+        self.emails: List[str] = []
+        self._index: Set[str] = set()
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __contains__(self, email: str) -> bool:
+        # Não recarrega (pode ser chamado sob outros locks); use check() antes
+        return normalize_email(email) in self._index
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self) -> List[str]:
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return list(json.load(f).get("authorized_emails", []))
+        except Exception as e:
+            logger.error(f"Erro ao carregar emails autorizados: {e}")
+            return list(self.emails)  # Arquivo inválido: mantém a última lista boa
+
+    def _set(self, emails: List[str], signature):
+        index = {normalize_email(e) for e in emails}
+        revoked = self._index - index
+        self.emails, self._index, self._signature = emails, index, signature
+        if revoked and self.on_revoke is not None:
+            self.on_revoke(revoked)
+
+    def reload(self):
+        """Relê o arquivo agora."""
+        with self._lock:
+            signature = self._stat()
+            self._set(self._read(), signature)
+
+    def check(self):
+        """Recarrega se o arquivo mudou desde a última leitura (stat limitado a CHECK_INTERVAL)."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + CHECK_INTERVAL
+        if self._stat() != self._signature:
+            logger.info("authorized_emails.json mudou; recarregando.")
+            self.reload()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def update(self, change: Callable[[List[str]], List[str]]) -> List[str]:
+        """Aplica ``change`` à lista atual do arquivo e grava (bloqueante)."""
+        with self._lock, self._file_lock():
+            emails = change(self._read())
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"authorized_emails": emails}, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._set(emails, self._stat())
+        return emails
@@ -1,13 +1,15 @@
 import os
-import json
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, List
+from cachetools import TTLCache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from google_certs import CachingRequest, verify_oauth2_token
+from access_control import AccessControlStore, normalize_email
 import secrets
 
 # Configurações
@@ -15,7 +17,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 dias
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+# Certificados públicos dos ID tokens do Google (pode apontar para um endpoint local em testes)
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
 AUTHORIZED_EMAILS_FILE = "authorized_emails.json"
+# Tokens já verificados (assinatura + email autorizado): evita decodificar o JWT a cada requisição
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+TOKEN_CACHE_SECONDS = float(os.getenv("TOKEN_CACHE_SECONDS", 300))
+# Tickets de /api/events: vão na URL (EventSource não envia headers), então valem pouco e uma vez só
+STREAM_TICKET_SECONDS = int(os.getenv("STREAM_TICKET_SECONDS", 30))
+STREAM_TICKET_SCOPE = "stream"
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
@@ -24,51 +34,55 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class AuthManager:
-    def __init__(self):
-        self.authorized_emails = self.load_authorized_emails()
-        
-    def load_authorized_emails(self) -> List[str]:
-        """Carrega a lista de emails autorizados do arquivo JSON."""
-        if os.path.exists(AUTHORIZED_EMAILS_FILE):
-            try:
-                with open(AUTHORIZED_EMAILS_FILE, 'r') as f:
-                    data = json.load(f)
-                    return data.get("authorized_emails", [])
-            except Exception as e:
-                print(f"Erro ao carregar emails autorizados: {e}")
-                return []
-        return []
+    def __init__(self, emails_file: str = AUTHORIZED_EMAILS_FILE):
+        self._token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_SECONDS)
+        self._cache_lock = threading.Lock()
+        # jti dos tickets de stream já usados, até expirarem
+        self._used_tickets = TTLCache(maxsize=10_000, ttl=STREAM_TICKET_SECONDS)
+        self.google_request = CachingRequest()
+        # Emails removidos (pelo admin, à mão ou por outro worker) derrubam os tokens em cache
+        self.access = AccessControlStore(emails_file, on_revoke=self.invalidate_tokens)
+    
+    @property
+    def authorized_emails(self) -> List[str]:
+        self.access.check()
+        return self.access.emails
     
     def save_authorized_emails(self, emails: List[str]):
-        """Salva a lista de emails autorizados."""
-        with open(AUTHORIZED_EMAILS_FILE, 'w') as f:
-            json.dump({"authorized_emails": emails}, f, indent=2)
-        self.authorized_emails = emails
+        """Salva a lista de emails autorizados (escrita atômica; bloqueante)."""
+        self.access.update(lambda current: list(emails))
     
     def is_email_authorized(self, email: str) -> bool:
         """Verifica se o email está na lista de autorizados."""
-        return email.lower() in [e.lower() for e in self.authorized_emails]
+        self.access.check()
+        return email in self.access
     
     def add_authorized_email(self, email: str):
-        """Adiciona um email à lista de autorizados."""
-        if email.lower() not in [e.lower() for e in self.authorized_emails]:
-            self.authorized_emails.append(email)
-            self.save_authorized_emails(self.authorized_emails)
+        """Adiciona um email à lista de autorizados (bloqueante)."""
+        def add(current):
+            if normalize_email(email) in {normalize_email(e) for e in current}:
+                return current
+            return current + [email]
+        self.access.update(add)
     
     def remove_authorized_email(self, email: str):
-        """Remove um email da lista de autorizados."""
-        self.authorized_emails = [e for e in self.authorized_emails if e.lower() != email.lower()]
-        self.save_authorized_emails(self.authorized_emails)
+        """Remove um email da lista de autorizados (os tokens dele deixam de valer na hora; bloqueante)."""
+        email = normalize_email(email)
+        self.access.update(lambda current: [e for e in current if normalize_email(e) != email])
+    
+    def invalidate_tokens(self, emails):
+        """Descarta do cache os tokens verificados dos emails informados (normalizados)."""
+        with self._cache_lock:
+            stale = [token for token, payload in self._token_cache.items()
+                     if normalize_email(payload["email"]) in emails]
+            for token in stale:
+                del self._token_cache[token]
     
     def verify_google_token(self, token: str) -> dict:
         """Verifica o token do Google e retorna as informações do usuário."""
         try:
-            # Verifica o token com o Google
-            idinfo = id_token.verify_oauth2_token(
-                token, 
-                requests.Request(), 
-                GOOGLE_CLIENT_ID
-            )
+            # Verifica o token localmente, com os certificados do Google em cache
+            idinfo = verify_oauth2_token(token, self.google_request, GOOGLE_CLIENT_ID, GOOGLE_CERTS_URL)
             
             # Verifica se o email está autorizado
             email = idinfo.get('email')
@@ -111,11 +125,22 @@ class AuthManager:
         return encoded_jwt
     
     def verify_token(self, token: str) -> dict:
-        """Verifica e decodifica um JWT token."""
+        """Verifica e decodifica um JWT token.
+        
+        O payload de tokens já verificados fica em cache por até
+        TOKEN_CACHE_SECONDS (nunca além do ``exp``) e sai do cache quando o
+        email é removido dos autorizados.
+        """
+        self.access.check()  # Remoções feitas fora deste processo também invalidam o cache
+        with self._cache_lock:
+            payload = self._token_cache.get(token)
+        if payload is not None and payload["exp"] > time.time():
+            return dict(payload)
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             email: str = payload.get("email")
-            if email is None:
+            # Ticket de stream não serve como token de acesso
+            if email is None or payload.get("scope") == STREAM_TICKET_SCOPE:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Token inválido"
@@ -127,14 +152,52 @@ class AuthManager:
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Email não está mais autorizado"
                 )
-                
-            return payload
+            
+            if isinstance(payload.get("exp"), (int, float)):
+                with self._cache_lock:
+                    # Confere de novo sob o lock: uma remoção concorrente não deixa o token em cache
+                    if email in self.access:
+                        self._token_cache[token] = payload
+            return dict(payload)
         except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido ou expirado"
             )
 
+    def create_stream_ticket(self, user: dict) -> str:
+        """Cria um ticket de uso único e curta duração para abrir /api/events."""
+        return self.create_access_token(
+            {"email": user["email"], "scope": STREAM_TICKET_SCOPE, "jti": secrets.token_urlsafe(16)},
+            expires_delta=timedelta(seconds=STREAM_TICKET_SECONDS)
+        )
+    
+    def redeem_stream_ticket(self, ticket: str) -> dict:
+        """Valida e consome um ticket de stream (um segundo uso é recusado)."""
+        try:
+            payload = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            payload = {}
+        jti = payload.get("jti")
+        if payload.get("scope") != STREAM_TICKET_SCOPE or not jti or not payload.get("email"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Ticket inválido ou expirado"
+            )
+        with self._cache_lock:
+            if jti in self._used_tickets:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Ticket já utilizado"
+                )
+            self._used_tickets[jti] = True
+        if not self.is_email_authorized(payload["email"]):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Email não está mais autorizado"
+            )
+        return payload
+
 # Instância global do gerenciador de autenticação
 auth_manager = AuthManager()
 
@@ -149,6 +212,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     
     return auth_manager.verify_token(token)
 
+async def get_current_user_stream(
+    token: str = Depends(oauth2_scheme),
+    ticket: Optional[str] = Query(None)
+) -> dict:
+    """Como get_current_user, mas aceita um ticket de stream em ?ticket= (EventSource não envia headers).
+    
+    O token de acesso nunca vai na URL: ele ficaria nos logs de acesso do
+    uvicorn e dos proxies. O ticket vale STREAM_TICKET_SECONDS e uma vez só.
+    """
+    if token or not ticket:
+        return await get_current_user(token)
+    return auth_manager.redeem_stream_ticket(ticket)
+
 async def get_current_user_optional(token: str = Depends(oauth2_scheme)) -> Optional[dict]:
     """Dependência para obter o usuário atual (opcional)."""
     if not token:
@@ -0,0 +1,273 @@
+"""
+Fontes de arquivos do scan (backends)
+
+O pipeline do DriveScanner (travessia -> classificação -> registros ->
+agregação, com índice, scan incremental e versões) não depende de onde os
+arquivos estão: ele conversa com um ``ScanBackend``, que entrega itens no
+formato da API do Drive v3::
+
+    {"id", "name", "mimeType", "modifiedTime", "size", "webViewLink", "parents"}
+
+- DriveBackend: Google Drive real (credenciais de service account) ou um
+  serviço já construído, como o fake_drive.FakeDriveService dos benchmarks.
+- LocalBackend: uma pasta local (BASE_PATH), listada com os.scandir. Os ids
+  são caminhos relativos; não há API de mudanças (todo scan é completo).
+
+Um backend novo só precisa implementar os métodos de ScanBackend.
+"""
+
+import json
+import logging
+import mimetypes
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Protocol, Tuple
+
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+DRIVE_SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+ITEM_FIELDS = "id, name, mimeType, modifiedTime, size, webViewLink, parents, trashed"
+LIST_FIELDS = f"nextPageToken, files({ITEM_FIELDS})"
+CHANGE_FIELDS = f"nextPageToken, newStartPageToken, changes(fileId, removed, file({ITEM_FIELDS}))"
+PAGE_SIZE = 1000
+
+# Motivos de erro 403 que indicam limite de taxa (e não falta de permissão)
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+
+class BackendError(Exception):
+    """Falha do backend que o scanner sabe tratar (ex.: token de mudanças inválido)."""
+
+
+class ScanBackend(Protocol):
+    """O que o pipeline do scan precisa de uma fonte de arquivos."""
+
+    root_id: Optional[str]  # Pasta raiz padrão (None: o scanner define)
+    available: bool         # False se a conexão falhou; o scan é abortado
+    calls: Counter          # Chamadas feitas à fonte, por método
+
+    def list_entries(self, folder_id: str) -> List[dict]:
+        """Itens diretos de uma pasta (todas as páginas). Chamado em paralelo pelo pool."""
+
+    def list_all(self) -> Iterator[List[dict]]:
+        """Todos os itens visíveis, página a página (a árvore sai de ``parents``)."""
+
+    def start_token(self) -> Optional[str]:
+        """Token do estado atual para ``list_changes`` (None: sem API de mudanças)."""
+
+    def list_changes(self, token: str) -> Tuple[List[dict], str]:
+        """Mudanças desde ``token``: (mudanças no formato do Drive, novo token). BackendError se o token não vale."""
+
+
+class DriveBackend:
+    """Google Drive v3, com backoff exponencial em limite de taxa e falhas do servidor."""
+
+    root_id = None
+
+    def __init__(self, credentials_info=None, service=None, max_retries: int = 5,
+                 backoff_base: float = 1.0, backoff_max: float = 32.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+        # O cliente da API (httplib2) não é thread-safe: cada thread do pool
+        # constrói o seu próprio serviço a partir das mesmas credenciais.
+        self._credentials = None
+        self._local = threading.local()
+        if service is not None:
+            # Serviço já construído (ex.: fake_drive.FakeDriveService), compartilhado entre threads
+            self.service = service
+            return
+        try:
+            self._credentials = service_account.Credentials.from_service_account_info(
+                credentials_info,
+                scopes=DRIVE_SCOPES
+            )
+            self.service = self._build_service()
+            logger.info("Serviço do Google Drive conectado com sucesso.")
+        except Exception as e:
+            logger.error(f"Falha ao conectar com o Google Drive: {e}")
+            self.service = None
+
+    @classmethod
+    def from_service_account_file(cls, key_file, **kwargs) -> "DriveBackend":
+        with open(key_file, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    @property
+    def available(self) -> bool:
+        return self.service is not None
+
+    def _build_service(self):
+        return build('drive', 'v3', credentials=self._credentials, cache_discovery=False)
+
+    def _get_service(self):
+        """Retorna o serviço do Drive da thread atual (criado sob demanda)."""
+        if self._credentials is None:
+            return self.service
+        service = getattr(self._local, "service", None)
+        if service is None:
+            if threading.current_thread() is threading.main_thread():
+                service = self.service
+            else:
+                service = self._build_service()
+            self._local.service = service
+        return service
+
+    def _is_retryable(self, error) -> bool:
+        """Indica se o erro da API é temporário (limite de taxa ou falha do servidor)."""
+        status = getattr(error.resp, "status", None)
+        if status == 429 or (status is not None and status >= 500):
+            return True
+        if status == 403:
+            details = error.error_details if isinstance(error.error_details, list) else []
+            reasons = {d.get('reason') for d in details if isinstance(d, dict)}
+            return bool(reasons & RATE_LIMIT_REASONS) or 'rate limit' in str(error.reason).lower()
+        return False
+
+    def _execute(self, method: str, request):
+        """Executa uma requisição da API com backoff exponencial (com jitter)."""
+        attempt = 0
+        while True:
+            with self._calls_lock:
+                self.calls[method] += 1
+            try:
+                return request.execute()
+            except HttpError as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                logger.warning(
+                    f"Limite da API atingido (HTTP {e.resp.status}), "
+                    f"nova tentativa em {delay:.1f}s ({attempt + 1}/{self.max_retries})"
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def _paginate(self, query: str) -> Iterator[List[dict]]:
+        service = self._get_service()
+        page_token = None
+        while True:
+            results = self._execute("files.list", service.files().list(
+                q=query,
+                pageSize=PAGE_SIZE,
+                fields=LIST_FIELDS,
+                pageToken=page_token
+            ))
+            yield results.get('files', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+    def list_entries(self, folder_id: str) -> List[dict]:
+        items = []
+        for page in self._paginate(f"'{folder_id}' in parents and trashed = false"):
+            items.extend(page)
+        return items
+
+    def list_all(self) -> Iterator[List[dict]]:
+        return self._paginate("trashed = false")
+
+    def start_token(self) -> Optional[str]:
+        response = self._execute("changes.getStartPageToken", self._get_service().changes().getStartPageToken())
+        return response.get('startPageToken')
+
+    def list_changes(self, token: str) -> Tuple[List[dict], str]:
+        service = self._get_service()
+        changes = []
+        try:
+            while True:
+                response = self._execute("changes.list", service.changes().list(
+                    pageToken=token,
+                    pageSize=PAGE_SIZE,
+                    includeRemoved=True,
+                    spaces='drive',
+                    fields=CHANGE_FIELDS
+                ))
+                changes.extend(response.get('changes', []))
+
+                if 'newStartPageToken' in response:
+                    return changes, response['newStartPageToken']
+                token = response['nextPageToken']
+        except HttpError as e:
+            raise BackendError(str(e)) from e
+
+
+class LocalBackend:
+    """Pasta local vista como um Drive: ids são caminhos relativos ("." é a raiz).
+
+    ``webViewLink`` é o próprio caminho relativo, que é o que o dashboard mostra
+    para arquivos locais. Links para pastas não são seguidos (evita ciclos).
+    """
+
+    root_id = "."
+    available = True
+
+    def __init__(self, base_path):
+        self.base_path = Path(base_path)
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    def _path(self, entry_id: str) -> Path:
+        return self.base_path if entry_id == self.root_id else self.base_path / entry_id
+
+    def _item(self, entry_id: str, name: str, parent_id: str, is_dir: bool, stat: os.stat_result) -> dict:
+        if is_dir:
+            return {"id": entry_id, "name": name, "mimeType": FOLDER_MIME_TYPE, "parents": [parent_id]}
+        modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+        return {
+            "id": entry_id,
+            "name": name,
+            "mimeType": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "modifiedTime": modified.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "size": str(stat.st_size),
+            "webViewLink": entry_id,
+            "parents": [parent_id]
+        }
+
+    def list_entries(self, folder_id: str) -> List[dict]:
+        with self._calls_lock:
+            self.calls["scandir"] += 1
+        prefix = "" if folder_id == self.root_id else folder_id + "/"
+        items = []
+        with os.scandir(self._path(folder_id)) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if not is_dir and not entry.is_file():
+                        continue
+                    # Pastas não precisam de stat (o tipo vem da própria listagem)
+                    stat = None if is_dir else entry.stat()
+                    items.append(self._item(prefix + entry.name, entry.name, folder_id, is_dir, stat))
+                except OSError as e:
+                    logger.error(f"Erro ao processar {entry.path}: {e}")
+        return items
+
+    def list_all(self) -> Iterator[List[dict]]:
+        # Uma "página" por pasta: não há listagem plana no sistema de arquivos
+        pending = [self.root_id]
+        while pending:
+            try:
+                page = self.list_entries(pending.pop())
+            except OSError as e:
+                logger.error(f"Erro ao escanear diretório: {e}")
+                continue
+            pending.extend(item["id"] for item in page if item["mimeType"] == FOLDER_MIME_TYPE)
+            yield page
+
+    def start_token(self) -> Optional[str]:
+        return None
+
+    def list_changes(self, token: str) -> Tuple[List[dict], str]:
+        raise BackendError("Pasta local não tem API de mudanças")
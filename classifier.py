@@ -0,0 +1,162 @@
+"""
+Classificação de arquivos por disciplina (palavras-chave do config["disciplines"])
+
+Palavras-chave e textos são normalizados do mesmo jeito (minúsculas, sem
+acento), então "Hidráulica" casa com "HIDRAULICA" e "hidráulica". Todas as
+palavras-chave viram uma única regex; a disciplina vencedora é a primeira na
+ordem do config com alguma palavra-chave no nome ou no caminho, como antes.
+
+O resultado do caminho é guardado em cache: os arquivos de uma mesma pasta
+reaproveitam a busca feita no caminho. FolderHintCache guarda esse resultado
+por id de pasta do Drive entre scans (e entre processos).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from search_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISCIPLINE = "others"
+PATH_CACHE_SIZE = 4096
+FOLDER_HINTS_SIZE = 50_000
+
+
+class DisciplineClassifier:
+    """Classificador montado uma vez a partir de ``config["disciplines"]``."""
+
+    def __init__(self, disciplines: Dict[str, dict], default: str = DEFAULT_DISCIPLINE):
+        self.default = default
+        self.disciplines = [key for key in disciplines if key != default]
+        # palavra-chave normalizada -> prioridade (posição da disciplina no config)
+        self._priority: Dict[str, int] = {}
+        for priority, disc_key in enumerate(self.disciplines):
+            for keyword in disciplines[disc_key].get("keywords", []):
+                self._priority.setdefault(normalize_text(keyword), priority)
+        self._priority_of = {disc_key: priority for priority, disc_key in enumerate(self.disciplines)}
+        # Identifica as palavras-chave/prioridades (dicas salvas com outra config são descartadas)
+        self.signature = hashlib.sha1(json.dumps(
+            [self.default, self.disciplines, sorted(self._priority.items())]).encode()).hexdigest()
+
+        ordered = sorted(self._priority, key=lambda k: (self._priority[k], -len(k)))
+        keywords = "|".join(re.escape(k) for k in ordered)
+        # O lookahead encontra palavras-chave sobrepostas em qualquer posição
+        self._pattern = re.compile(f"(?=({keywords}))") if keywords else None
+        # _below[p]: regex só com as palavras-chave de prioridade < p, para
+        # descartar rápido o texto que não tem como vencer a disciplina p
+        self._below = []
+        for threshold in range(len(self.disciplines) + 1):
+            alternatives = [re.escape(k) for k in ordered if self._priority[k] < threshold]
+            self._below.append(re.compile("|".join(alternatives)) if alternatives else None)
+        self._match_path = lru_cache(maxsize=PATH_CACHE_SIZE)(self._best_priority)
+
+    def _best_priority(self, text: str, below: Optional[int] = None) -> Optional[int]:
+        """Menor prioridade entre as palavras-chave contidas em ``text`` (None se nenhuma).
+        
+        Com ``below``, só interessam prioridades menores que ela.
+        """
+        quick = self._below[len(self.disciplines) if below is None else below]
+        if quick is None:
+            return None
+        text = normalize_text(text)
+        if quick.search(text) is None:
+            return None
+        best = None
+        priority = self._priority
+        for match in self._pattern.finditer(text):
+            value = priority[match.group(1)]
+            if best is None or value < best:
+                best = value
+                if best == 0:
+                    break
+        return best
+
+    def classify_path(self, path: str) -> Optional[str]:
+        """Disciplina indicada só pelo caminho (em cache), ou None."""
+        best = self._match_path(path)
+        return None if best is None else self.disciplines[best]
+
+    def classify_name(self, file_name: str, path_hint: Optional[str]) -> str:
+        """Disciplina do arquivo a partir do nome e da dica do caminho (``classify_path``)."""
+        path_best = None if path_hint is None else self._priority_of[path_hint]
+        if path_best == 0:
+            return path_hint
+        name_best = self._best_priority(file_name, below=path_best)
+        if name_best is not None:
+            return self.disciplines[name_best]
+        return self.default if path_hint is None else path_hint
+
+    def classify(self, file_name: str, path_parts: List[str]) -> str:
+        """Disciplina do arquivo a partir do nome e do caminho."""
+        return self.classify_name(file_name, self.classify_path(" ".join(path_parts)))
+
+
+class FolderHintCache:
+    """Disciplina sugerida pelo caminho de cada pasta, por id da pasta do Drive (LRU).
+    
+    Cada entrada guarda o caminho usado na classificação: se a pasta (ou um
+    ancestral) for renomeada, o caminho muda e a dica é recalculada.
+    """
+
+    def __init__(self, maxsize: int = FOLDER_HINTS_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (caminho, disciplina ou None)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, folder_id: str, path: str, compute: Callable[[], Optional[str]]) -> Optional[str]:
+        entry = self._entries.get(folder_id)
+        if entry is not None and entry[0] == path:
+            self._entries.move_to_end(folder_id)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        hint = compute()
+        self._entries[folder_id] = (path, hint)
+        self._entries.move_to_end(folder_id)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return hint
+
+    def load(self, path: Path, signature: str):
+        """Carrega as dicas salvas, se foram calculadas com as mesmas palavras-chave."""
+        path = Path(path)
+        if not path.exists():
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao carregar dicas de pasta: {e}")
+            return
+        if state.get("signature") != signature:
+            logger.info("Palavras-chave mudaram; dicas de pasta descartadas.")
+            return
+        # Salvas da menos para a mais usada: a ordem do LRU se mantém
+        for folder_id, (folder_path, hint) in state.get("folders", {}).items():
+            self._entries[folder_id] = (folder_path, hint)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def save(self, path: Path, signature: str):
+        """Salva as dicas (escrita atômica)."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        state = {"signature": signature, "folders": {k: list(v) for k, v in self._entries.items()}}
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao salvar dicas de pasta: {e}")
@@ -1,5 +1,81 @@
-from scanner import FileScanner
+#!/usr/bin/env python3
+"""
+Scan pela linha de comando, sem subir a API
 
+    python cli.py [BASE_PATH] [--output file_data.json] [--watch]
+    python cli.py BASE_PATH --backend local   # pipeline do DriveScanner sobre a pasta local
+    python cli.py --backend drive             # Google Drive (GOOGLE_CREDS_JSON no .env)
 
-def main():
-    FileScanner.main()
\ No newline at end of file
+``pastas`` (padrão) é o FileScanner: uma pasta por disciplina, com hash dos
+arquivos. ``local`` e ``drive`` usam o pipeline do DriveScanner (classificação
+por palavras-chave, índice e versões) com o backend correspondente; ``local``
+guarda o seu estado em local_state.json, sem tocar no drive_state.json do servidor.
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+
+def build_scanner(args):
+    if args.backend == "pastas":
+        from scanner import FileScanner
+        return FileScanner(args.path)
+
+    from drive_scanner import DriveScanner, DEFAULT_CONFIG
+    if args.backend == "local":
+        from backends import LocalBackend
+        # Estado próprio: o drive_state.json do servidor (índice e token do Drive) fica intacto
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config.update(state_file="local_state.json", folder_hints_file="local_folder_hints.json")
+        return DriveScanner(None, config=config, backend=LocalBackend(args.path))
+    creds_json = os.getenv("GOOGLE_CREDS_JSON")
+    if not creds_json:
+        raise SystemExit("ERRO: GOOGLE_CREDS_JSON não encontrado no .env")
+    try:
+        return DriveScanner(json.loads(creds_json))
+    except json.JSONDecodeError:
+        raise SystemExit("ERRO: GOOGLE_CREDS_JSON não é um JSON válido")
+
+
+def write_output(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    total = sum(d["total_files"] for d in data["disciplines"].values())
+    print(f"{total} arquivos salvos em {path}")
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=os.getenv("BASE_PATH"), help="Pasta dos projetos (padrão: BASE_PATH)")
+    parser.add_argument("--backend", choices=("pastas", "local", "drive"), default="pastas")
+    parser.add_argument("--output", default="file_data.json", help="Arquivo do resultado")
+    parser.add_argument("--watch", action="store_true", help="Continua observando a pasta (só --backend pastas)")
+    args = parser.parse_args(argv)
+
+    if args.backend != "drive" and not args.path:
+        parser.error("informe a pasta dos projetos ou defina BASE_PATH no .env")
+    if args.watch and args.backend != "pastas":
+        parser.error("--watch só está disponível com --backend pastas")
+
+    scanner = build_scanner(args)
+    if not args.watch:
+        write_output(scanner.run_once(), args.output)
+        return 0
+
+    stop = threading.Event()
+    try:
+        scanner.watch(lambda data: write_output(data, args.output), stop_event=stop)
+    except KeyboardInterrupt:
+        stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
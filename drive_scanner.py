@@ -1,222 +1,816 @@
 import os
+import copy
 import json
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 import logging
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from backends import BackendError, DriveBackend, ScanBackend, FOLDER_MIME_TYPE
+from classifier import DisciplineClassifier, FolderHintCache, FOLDER_HINTS_SIZE
+from scan_base import ScannerBase
+from snapshot_format import drive_view_url
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class DriveScanner:
-    def __init__(self, credentials_info, config=None):
-        # ID da pasta raiz dos projetos (extraído da URL que você passou)
-        self.root_folder_id = "19VT84IP7Snl4Kg3HUd5MJoNc1U4sv3Rc"
-        
-        self.config = config or {
-            "notes_file": "file_notes.json",
-            "disciplines": {
-                "architecture": {"name": "ARQUITETURA", "keywords": ["Arquitetura", "arq", "arch"]},
-                "structure": {"name": "ESTRUTURA", "keywords": ["Estrutura", "estrut", "concreto", "armação"]},
-                "hydraulic": {"name": "HIDRÁULICA", "keywords": ["Hidráulica", "hidro", "hidr", "água", "esgoto"]},
-                "metallic": {"name": "METÁLICA", "keywords": ["Metálica", "metal", "aço", "steel"]},
-                "electrical": {"name": "ELÉTRICA", "keywords": ["eletrica", "eletr", "energia", "volt"]},
-                "others": {"name": "OUTROS", "keywords": []}  # Categoria padrão
-            }
-        }
-        self.notes = self.load_notes()
+RELEVANT_EXTENSIONS = {'dwg', 'pdf', 'xlsx', 'xls', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'zip'}
+STATE_CHUNK = 5000  # Arquivos do índice por bloco ao salvar o estado
+# Pasta raiz dos projetos no Drive (extraída da URL compartilhada)
+ROOT_FOLDER_ID = "19VT84IP7Snl4Kg3HUd5MJoNc1U4sv3Rc"
+
+DEFAULT_CONFIG = {
+    "notes_file": "file_notes.json",
+    "disciplines": {
+        "architecture": {"name": "ARQUITETURA", "keywords": ["Arquitetura", "arq", "arch"]},
+        "structure": {"name": "ESTRUTURA", "keywords": ["Estrutura", "estrut", "concreto", "armação"]},
+        "hydraulic": {"name": "HIDRÁULICA", "keywords": ["Hidráulica", "hidro", "hidr", "água", "esgoto"]},
+        "metallic": {"name": "METÁLICA", "keywords": ["Metálica", "metal", "aço", "steel"]},
+        "electrical": {"name": "ELÉTRICA", "keywords": ["eletrica", "eletr", "energia", "volt"]},
+        "others": {"name": "OUTROS", "keywords": []}  # Categoria padrão
+    },
+    "scan_strategy": "recursive",  # "recursive" (uma consulta por pasta) ou "flat"
+    "max_workers": 8,      # Pastas listadas em paralelo
+    "max_retries": 5,      # Tentativas extras em 403/429/5xx
+    "backoff_base": 1.0,   # Segundos (cresce exponencialmente)
+    "backoff_max": 32.0,
+    "state_file": "drive_state.json",  # Índice + token da API de mudanças
+    "folder_hints_file": "folder_hints.json",  # Disciplina sugerida por pasta (ao lado do snapshot)
+    "folder_hints_size": FOLDER_HINTS_SIZE,    # Máximo de pastas no cache (LRU)
+    "full_scan_interval": 6 * 3600,    # Reconciliação completa (segundos)
+    "partial_interval": 5.0            # Resultado parcial durante scans completos (segundos)
+}
+
+class FileEntry:
+    """Arquivo relevante no índice do scan (um objeto compacto por arquivo, sem dict).
+    
+    ``link`` só é guardado quando difere do link padrão derivado do id.
+    ``discipline`` memoriza a classificação feita com a dica de pasta ``hint``;
+    ela vai para o estado salvo e passa de um scan completo para o seguinte.
+    """
+    __slots__ = ("id", "name", "modified_time", "size", "parent", "link", "discipline", "hint")
+
+    def __init__(self, file_id: str, name: str, modified_time: str, size: int,
+                 parent: Optional[str], link: Optional[str] = None):
+        self.id = file_id
+        self.name = name
+        self.modified_time = modified_time
+        self.size = size
+        self.parent = parent
+        self.link = link
+        self.discipline = None
+        self.hint = None
+
+    @classmethod
+    def from_item(cls, item: dict, parent_id: Optional[str]) -> "FileEntry":
+        link = item.get('webViewLink')
+        if link == drive_view_url(item['id']):
+            link = None
+        # Muitos arquivos apontam para a mesma pasta: compartilha a string do id
+        parent = sys.intern(parent_id) if parent_id else parent_id
+        return cls(item['id'], item['name'], item['modifiedTime'], int(item.get('size') or 0), parent, link)
+
+    def keep_classification(self, previous: Optional["FileEntry"]) -> "FileEntry":
+        """Reaproveita a classificação de ``previous`` (mesmo id) se o nome e a pasta não mudaram."""
+        if previous is not None and previous.name == self.name and previous.parent == self.parent:
+            self.discipline = previous.discipline
+            self.hint = previous.hint
+        return self
+
+    @property
+    def web_view_link(self) -> str:
+        return self.link or drive_view_url(self.id)
+
+    def to_state(self) -> list:
+        return [self.name, self.modified_time, self.size, self.parent, self.link, self.discipline, self.hint]
+
+    @classmethod
+    def from_state(cls, file_id: str, row) -> "FileEntry":
+        if isinstance(row, dict):  # Estado salvo antes dos registros compactos
+            return cls.from_item(row, row.get("parent"))
+        entry = cls(file_id, *row[:5])
+        if len(row) > 5:  # Estados antigos não guardavam a classificação
+            # Poucos valores distintos (chaves de disciplina): compartilha as strings
+            entry.discipline = sys.intern(row[5]) if row[5] else row[5]
+            entry.hint = sys.intern(row[6]) if row[6] else row[6]
+        return entry
+
+
+class DisciplineAccumulator:
+    """Última etapa do pipeline do scan: agrega os registros por disciplina.
+    
+    ``folders`` de cada disciplina são as pastas do primeiro nível abaixo da
+    raiz do scan (``level`` = tamanho do prefixo do caminho) com algum arquivo
+    dela, em qualquer profundidade; arquivos soltos na raiz não contam.
+    """
+
+    def __init__(self, disciplines, level: int = 0):
+        self.files = {k: [] for k in disciplines}
+        self.folders = {k: set() for k in disciplines}
+        self.count = 0
+        self.level = level
+
+    def add(self, discipline: str, info: dict, folder_id: str, path_parts: List[str]):
+        self.files[discipline].append(info)
+        self.count += 1
+        if len(path_parts) > self.level:
+            self.folders[discipline].add(path_parts[self.level])
+
+    def partial(self) -> Tuple[Dict[str, List], Dict[str, List]]:
+        """Cópia do que já foi agregado, com o scan ainda em andamento."""
+        return {k: list(v) for k, v in self.files.items()}, {k: sorted(v) for k, v in self.folders.items()}
+
+    def finish(self) -> Tuple[Dict[str, List], Dict[str, List]]:
+        # Ordem estável independente da ordem de conclusão das threads
+        for files in self.files.values():
+            files.sort(key=lambda f: (f['path'], f['name']))
+        return self.files, {k: sorted(v) for k, v in self.folders.items()}
+
+
+class DriveScanner(ScannerBase):
+    """Pipeline de scan com índice, scan incremental e versões, sobre qualquer ``ScanBackend``.
+    
+    Por padrão lê o Google Drive com ``credentials_info``; ``service`` (ex.:
+    fake_drive.FakeDriveService) ou ``backend`` (ex.: backends.LocalBackend)
+    trocam a fonte dos arquivos.
+    """
+
+    def __init__(self, credentials_info, config=None, service=None, backend: Optional[ScanBackend] = None):
+        super().__init__(config or copy.deepcopy(DEFAULT_CONFIG))
+        self.scan_strategy = self.config.get("scan_strategy", "recursive")
+        self.max_workers = max(1, int(self.config.get("max_workers", 8)))
+        self.full_scan_interval = float(self.config.get("full_scan_interval", 6 * 3600))
+        self.partial_interval = float(self.config.get("partial_interval", 5.0))
+        self.classifier = DisciplineClassifier(self.config["disciplines"])
+        self.folder_hints = FolderHintCache(int(self.config.get("folder_hints_size", FOLDER_HINTS_SIZE)))
         
-        try:
-            creds = service_account.Credentials.from_service_account_info(
-                credentials_info, 
-                scopes=['https://www.googleapis.com/auth/drive.readonly']
+        # Índice do último scan: pastas {id: [nome, id_pai]} e arquivos
+        # relevantes {id: FileEntry}, mais o token da API de mudanças.
+        self.index = {"folders": {}, "files": {}}
+        self.page_token = None
+        self.last_full_scan = None
+        # Versão do scan: só aumenta quando o conteúdo muda. ``last_diff`` traz
+        # as mudanças da versão anterior para a atual (None se não há base).
+        self.scan_version = 0
+        self.last_diff = None
+        self._fingerprints = None
+        # Registros por disciplina do último resultado deste processo: o scan
+        # incremental refaz só os registros dos arquivos afetados pelas mudanças
+        self._last_result = None
+        self._pending_changes = None
+        # Progresso do scan em andamento (lido pelo ScanCoordinator para /api/status)
+        self.progress = {}
+        # O estado pode ser grande: é lido no primeiro run_once (na thread de
+        # scan), e não na construção, para não atrasar a inicialização da API.
+        self._state_loaded = False
+        
+        if backend is None:
+            backend = DriveBackend(
+                credentials_info, service=service,
+                max_retries=int(self.config.get("max_retries", 5)),
+                backoff_base=float(self.config.get("backoff_base", 1.0)),
+                backoff_max=float(self.config.get("backoff_max", 32.0))
             )
-            self.service = build('drive', 'v3', credentials=creds)
-            logger.info("Serviço do Google Drive conectado com sucesso.")
+        self.backend = backend
+        self.root_folder_id = backend.root_id or ROOT_FOLDER_ID
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available
+
+    def discipline_path(self, disc_key: str) -> str:
+        return self.root_folder_id  # Pasta raiz
+
+    def load_state(self):
+        """Carrega o índice e o token de mudanças salvos pelo último scan."""
+        self._state_loaded = True
+        self.folder_hints.load(self.config.get("folder_hints_file", "folder_hints.json"), self.classifier.signature)
+        state_path = Path(self.config.get("state_file", "drive_state.json"))
+        if not state_path.exists():
+            return
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
         except Exception as e:
-            logger.error(f"Falha ao conectar com o Google Drive: {e}")
-            self.service = None
-
-    def load_notes(self):
-        notes_path = Path(self.config["notes_file"])
-        if notes_path.exists():
-            try:
-                with open(notes_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Erro ao carregar notas: {e}")
-        return {}
-
-    def save_notes(self):
+            logger.error(f"Erro ao carregar estado do scan: {e}")
+            return
+        if state.get("root_folder_id") != self.root_folder_id:
+            logger.info("Estado do scan pertence a outra pasta raiz; ignorando.")
+            return
+        files = {fid: FileEntry.from_state(fid, row) for fid, row in state.get("files", {}).items()}
+        if state.get("classifier_signature") != self.classifier.signature:
+            # Palavras-chave mudaram: as classificações salvas não valem mais
+            for entry in files.values():
+                entry.discipline = entry.hint = None
+        self.index = {"folders": state.get("folders", {}), "files": files}
+        self.page_token = state.get("page_token")
+        self.last_full_scan = state.get("last_full_scan")
+        self.scan_version = max(self.scan_version, state.get("scan_version", 0))
+
+    def save_state(self):
+        """Salva o índice e o token de mudanças (escrita atômica)."""
+        state_path = Path(self.config.get("state_file", "drive_state.json"))
+        state = {
+            "root_folder_id": self.root_folder_id,
+            "page_token": self.page_token,
+            "last_full_scan": self.last_full_scan,
+            "scan_version": self.scan_version,
+            "classifier_signature": self.classifier.signature,
+            "folders": self.index["folders"]
+        }
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
         try:
-            with open(self.config["notes_file"], 'w', encoding='utf-8') as f:
-                json.dump(self.notes, f, ensure_ascii=False, indent=2)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                self._write_state(f, state)
+            os.replace(tmp_path, state_path)
         except Exception as e:
-            logger.error(f"Erro ao salvar notas: {e}")
-
-    def format_size(self, size_bytes):
-        if size_bytes is None:
-            return "0.0B"
-        size_bytes = int(size_bytes)
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f}{unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f}TB"
+            logger.error(f"Erro ao salvar estado do scan: {e}")
+        self.folder_hints.save(self.config.get("folder_hints_file", "folder_hints.json"), self.classifier.signature)
+
+    def _write_state(self, f, state: dict):
+        """Grava ``state`` mais os arquivos do índice em blocos de STATE_CHUNK.
+        
+        json.dump num arquivo codifica em Python puro e json.dumps do estado
+        inteiro monta uma string do tamanho do arquivo; json.dumps por bloco usa
+        o codificador em C sem esse pico de memória.
+        """
+        dumps = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+        f.write(dumps(state)[:-1] + ',"files":{')
+        files = list(self.index["files"].items())
+        for start in range(0, len(files), STATE_CHUNK):
+            chunk = {fid: entry.to_state() for fid, entry in files[start:start + STATE_CHUNK]}
+            f.write(("," if start else "") + dumps(chunk)[1:-1])
+        f.write("}}")
 
     def classify_file(self, file_name: str, path_parts: List[str]) -> str:
-        """Classifica o arquivo baseado no nome e caminho"""
-        # Converte tudo pra lowercase pra comparar
-        name_lower = file_name.lower()
-        path_lower = " ".join(path_parts).lower()
-        full_text = f"{name_lower} {path_lower}"
-        
-        # Verifica cada disciplina
-        for disc_key, disc_info in self.config["disciplines"].items():
-            if disc_key == "others":  # Pula a categoria padrão
-                continue
-            for keyword in disc_info["keywords"]:
-                if keyword in full_text:
-                    return disc_key
+        """Classifica o arquivo baseado no nome e caminho (sem diferenciar maiúsculas e acentos)"""
+        return self.classifier.classify(file_name, path_parts)
+
+    def build_file_info(self, entry: FileEntry, path_parts: List[str], path: str = None,
+                        discipline: str = None) -> Optional[Tuple[str, dict]]:
+        """Converte uma entrada do índice em registro de arquivo. Retorna (disciplina, info) ou None.
+        
+        ``path`` é o ``path_parts`` já unido por "/" (compartilhado entre os arquivos da pasta);
+        ``discipline``, se informada, dispensa a classificação.
+        """
+        ext = entry.name.split('.')[-1].lower()
+        # Filtra apenas arquivos relevantes
+        if ext not in RELEVANT_EXTENSIONS:
+            return None
         
-        return "others"  # Categoria padrão
+        # Classifica o arquivo
+        discipline = discipline or self.classify_file(entry.name, path_parts)
+        modified = datetime.fromisoformat(entry.modified_time.replace('Z', '+00:00'))
+        
+        # Tipo, tamanho formatado e data se repetem em milhares de registros:
+        # sys.intern evita uma cópia da string por arquivo
+        file_info = {
+            "id": entry.id,
+            "name": entry.name,
+            "type": sys.intern(ext),
+            "size": sys.intern(self.format_size(entry.size)),
+            "size_bytes": entry.size,
+            "modified": sys.intern(modified.strftime("%Y-%m-%d")),
+            "modified_timestamp": modified.timestamp(),
+            "path": path if path is not None else "/".join(path_parts),
+            "full_path": entry.web_view_link,
+            "hash": None  # Drive não fornece hash
+        }
+        
+        # Adiciona nota se existir
+        note_key = f"{discipline}_{entry.name}"
+        if note_key in self.notes:
+            file_info["notes"] = self.notes[note_key]
+        
+        return discipline, file_info
 
-    def list_files_recursive(self, folder_id: str, path_parts: List[str] = None) -> Dict[str, List]:
-        """Lista arquivos recursivamente, organizando por disciplina"""
-        if path_parts is None:
-            path_parts = []
+    def crawl_stream(self, folder_id: str, index: Dict[str, Dict]):
+        """Percorre a árvore a partir de ``folder_id`` preenchendo ``index`` e gera
+        (entrada, path_parts) de cada arquivo relevante assim que a sua pasta é listada.
+        
+        As pastas são listadas em paralelo (até ``max_workers`` requisições
+        simultâneas): cada subpasta encontrada entra na fila do pool assim que
+        a listagem da pasta pai termina.
+        """
+        folders, files = index["folders"], index["files"]
+        previous = self.index["files"]  # Classificações do último scan
+        progress = self.progress
+        progress.update(folders_listed=0, folders_pending=1, files_indexed=0, listing_errors=0)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="drive-scan") as executor:
+            pending = {executor.submit(self.backend.list_entries, folder_id): (folder_id, [])}
             
-        files_by_discipline = {k: [] for k in self.config["disciplines"].keys()}
-        folders_by_discipline = {k: set() for k in self.config["disciplines"].keys()}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    current_id, current_parts = pending.pop(future)
+                    progress["folders_listed"] += 1
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        logger.error(f"Erro ao listar arquivos na pasta {current_id}: {e}")
+                        progress["listing_errors"] += 1
+                        continue
+                    
+                    for item in items:
+                        if item['mimeType'] == FOLDER_MIME_TYPE:
+                            # É uma pasta - agenda a listagem no pool
+                            subfolder_parts = current_parts + [item['name']]
+                            logger.info(f"Processando pasta: {'/'.join(subfolder_parts)}")
+                            folders[item['id']] = [item['name'], current_id]
+                            pending[executor.submit(self.backend.list_entries, item['id'])] = (item['id'], subfolder_parts)
+                        elif self._is_relevant(item) and item['id'] not in files:
+                            # Arquivo em mais de uma pasta entra só pela primeira listada
+                            entry = FileEntry.from_item(item, current_id).keep_classification(previous.get(item['id']))
+                            files[item['id']] = entry
+                            yield entry, current_parts
+                    
+                    progress.update(folders_pending=len(pending), files_indexed=len(files))
+
+    def crawl(self, folder_id: str) -> Dict[str, Dict]:
+        """Percorre a árvore a partir de ``folder_id`` e devolve o índice de pastas e arquivos."""
+        index = {"folders": {}, "files": {}}
+        for _ in self.crawl_stream(folder_id, index):
+            pass
+        return index
+
+    def crawl_flat(self, root_id: str) -> Dict[str, Dict]:
+        """Monta o índice paginando todos os itens visíveis, sem uma consulta por pasta.
+        
+        A árvore é reconstruída em memória a partir do campo ``parents``; itens
+        que não descendem de ``root_id`` são descartados no final.
+        """
+        folders, files = {}, {}
+        previous = self.index["files"]  # Classificações do último scan
+        progress = self.progress
+        progress.update(pages_listed=0, files_indexed=0)
+        
+        for page in self.backend.list_all():
+            for item in page:
+                parent_id = (item.get('parents') or [None])[0]
+                if item['mimeType'] == FOLDER_MIME_TYPE:
+                    folders[item['id']] = [item['name'], parent_id]
+                elif self._is_relevant(item):
+                    files[item['id']] = FileEntry.from_item(item, parent_id).keep_classification(previous.get(item['id']))
+            progress.update(pages_listed=progress["pages_listed"] + 1, files_indexed=len(files))
+        
+        # Mantém só o que está sob a pasta raiz
+        memo = {}
+        folders.pop(root_id, None)
+        folders = {
+            fid: entry for fid, entry in folders.items()
+            if self._resolve_path(fid, root_id, folders, memo) is not None
+        }
+        files = {
+            fid: entry for fid, entry in files.items()
+            if self._resolve_path(entry.parent, root_id, folders, memo) is not None
+        }
+        logger.info(f"Listagem plana: {len(folders)} pastas e {len(files)} arquivos sob a raiz.")
+        return {"folders": folders, "files": files}
+
+    def build_index(self, root_id: str) -> Dict[str, Dict]:
+        """Percorre a árvore com a estratégia configurada."""
+        if self.scan_strategy == "flat":
+            return self.crawl_flat(root_id)
+        return self.crawl(root_id)
+
+    def _is_relevant(self, item: dict) -> bool:
+        return item['name'].split('.')[-1].lower() in RELEVANT_EXTENSIONS
+
+    def _resolve_path(self, folder_id: str, root_id: str, folders: Dict[str, List], memo: Dict) -> Optional[List[str]]:
+        """Monta o ``path_parts`` de uma pasta subindo pelos pais até a raiz (None se fora da árvore)."""
+        chain = []
+        seen = set()
+        current = folder_id
+        while current not in memo:
+            if current == root_id:
+                memo[current] = []
+                break
+            entry = folders.get(current)
+            if entry is None or current in seen:
+                memo[current] = None
+                break
+            seen.add(current)
+            chain.append(current)
+            current = entry[1]
+        
+        base = memo[current]
+        for fid in reversed(chain):
+            base = None if base is None else base + [folders[fid][0]]
+            memo[fid] = base
+        return memo[folder_id]
+
+    # --- Pipeline: travessia -> classificação -> registros -> agregação ---
+    def _folder_context(self, folder_id: str, path_parts: List[str], contexts: Dict) -> tuple:
+        """(path_parts, "a/b/c", dica de disciplina) da pasta, calculado uma vez por pasta."""
+        context = contexts.get(folder_id)
+        if context is None:
+            path = "/".join(path_parts)
+            # Pasta com o mesmo caminho do último scan reaproveita a dica
+            hint = self.folder_hints.get(folder_id, path, lambda: self.classifier.classify_path(" ".join(path_parts)))
+            context = contexts[folder_id] = (path_parts, path, hint)
+        return context
+
+    def _index_stream(self, index: Dict[str, Dict], root_id: str, path_prefix: List[str]):
+        """Etapa 1 a partir de um índice pronto: (entrada, contexto da pasta) de cada arquivo."""
+        memo, contexts = {}, {}
+        outside = set()
+        for entry in index["files"].values():
+            if entry.parent in outside:
+                continue
+            context = contexts.get(entry.parent)
+            if context is None:
+                path_parts = self._resolve_path(entry.parent, root_id, index["folders"], memo)
+                if path_parts is None:
+                    outside.add(entry.parent)  # Arquivo movido para fora da pasta raiz
+                    continue
+                context = self._folder_context(entry.parent, path_prefix + path_parts, contexts)
+            yield entry, context
+
+    def _traverse(self, root_id: str, index: Dict[str, Dict]):
+        """Etapa 1 de um scan completo: preenche ``index`` e gera os arquivos à medida que chegam.
+        
+        Na travessia por pasta os arquivos saem assim que a pasta é listada; na
+        listagem plana, só depois da última página (o caminho depende de todas as pastas).
+        """
+        if self.scan_strategy == "flat":
+            index.update(self.crawl_flat(root_id))
+            yield from self._index_stream(index, root_id, [])
+            return
+        contexts = {}
+        for entry, path_parts in self.crawl_stream(root_id, index):
+            yield entry, self._folder_context(entry.parent, path_parts, contexts)
+
+    def _classify_stream(self, stream):
+        """Etapa 2: disciplina de cada arquivo.
         
-        if not self.service:
-            return files_by_discipline
+        Só arquivos novos, renomeados ou com a dica da pasta alterada são reclassificados.
+        """
+        classify_name = self.classifier.classify_name
+        progress = self.progress
+        for entry, context in stream:
+            hint = context[2]
+            if entry.discipline is None or entry.hint != hint:
+                entry.discipline = classify_name(entry.name, hint)
+                entry.hint = hint
+                progress["files_classified"] += 1
+            yield entry, context
+
+    def _record_stream(self, stream):
+        """Etapa 3: registro da API de cada arquivo, com as notas."""
+        for entry, (path_parts, path, _) in stream:
+            classified = self.build_file_info(entry, path_parts, path, entry.discipline)
+            if classified is not None:
+                yield classified[0], classified[1], entry.parent, path_parts
 
+    def _run_pipeline(self, stream, on_file=None, on_partial=None, folder_level: int = 0) -> DisciplineAccumulator:
+        """Etapa 4: consome o fluxo e agrega por disciplina.
+        
+        ``on_file(disciplina, info)`` recebe cada registro assim que é produzido
+        (ex.: escrita incremental do snapshot); ``on_partial(resultado)`` recebe o
+        resultado parcial a cada ``partial_interval`` segundos.
+        """
+        hints = self.folder_hints
+        hits, misses = hints.hits, hints.misses
+        self.progress["files_classified"] = 0
+        accumulator = DisciplineAccumulator(self.config["disciplines"], folder_level)
+        next_partial = time.monotonic() + self.partial_interval
+        
+        for discipline, info, folder_id, path_parts in self._record_stream(self._classify_stream(stream)):
+            accumulator.add(discipline, info, folder_id, path_parts)
+            if on_file is not None:
+                on_file(discipline, info)
+            if on_partial is not None and time.monotonic() >= next_partial:
+                self.progress["files_streamed"] = accumulator.count
+                on_partial(self._assemble_result(*accumulator.partial(), log=False))
+                next_partial = time.monotonic() + self.partial_interval
+        
+        self.progress.update(files_streamed=accumulator.count, folder_hints_reused=hints.hits - hits,
+                             folder_hints_computed=hints.misses - misses)
+        logger.info(f"Classificação: {hints.hits - hits} pastas reaproveitadas, {hints.misses - misses} "
+                    f"calculadas; {self.progress['files_classified']} arquivos classificados.")
+        return accumulator
+
+    def build_disciplines(self, index: Dict[str, Dict], root_id: str, path_prefix: List[str] = None) -> Tuple[Dict[str, List], Dict[str, List]]:
+        """Organiza os arquivos do índice por disciplina."""
+        path_prefix = path_prefix or []
+        return self._run_pipeline(self._index_stream(index, root_id, path_prefix), folder_level=len(path_prefix)).finish()
+
+    def list_files_recursive(self, folder_id: str, path_parts: List[str] = None) -> Tuple[Dict[str, List], Dict[str, List]]:
+        """Lista arquivos recursivamente, organizando por disciplina"""
+        if not self.available:
+            empty = {k: [] for k in self.config["disciplines"].keys()}
+            return empty, {k: [] for k in empty}
+        return self.build_disciplines(self.build_index(folder_id), folder_id, path_parts)
+
+    def get_start_page_token(self) -> Optional[str]:
+        """Token da API de mudanças para o estado atual do Drive."""
         try:
-            # Lista todos os itens na pasta atual
-            query = f"'{folder_id}' in parents and trashed = false"
-            page_token = None
-            
-            while True:
-                results = self.service.files().list(
-                    q=query,
-                    pageSize=1000,
-                    fields="nextPageToken, files(id, name, mimeType, modifiedTime, size, webViewLink)",
-                    pageToken=page_token
-                ).execute()
-                
-                items = results.get('files', [])
-                
-                for item in items:
-                    if item['mimeType'] == 'application/vnd.google-apps.folder':
-                        # É uma pasta - processar recursivamente
-                        subfolder_name = item['name']
-                        logger.info(f"Processando pasta: {'/'.join(path_parts + [subfolder_name])}")
-                        
-                        # Busca arquivos na subpasta
-                        sub_results = self.list_files_recursive(
-                            item['id'], 
-                            path_parts + [subfolder_name]
-                        )
-                        
-                        # Mescla os resultados
-                        for disc_key in files_by_discipline:
-                            files_by_discipline[disc_key].extend(sub_results[disc_key])
-                            # Adiciona a pasta se tem arquivos dessa disciplina
-                            if sub_results[disc_key]:
-                                folders_by_discipline[disc_key].add(subfolder_name)
-                    else:
-                        # É um arquivo
-                        ext = item['name'].split('.')[-1].lower()
-                        # Filtra apenas arquivos relevantes
-                        if ext in ['dwg', 'pdf', 'xlsx', 'xls', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'zip']:
-                            # Classifica o arquivo
-                            discipline = self.classify_file(item['name'], path_parts)
-                            
-                            file_info = {
-                                "id": item['id'],
-                                "name": item['name'],
-                                "type": ext,
-                                "size": self.format_size(item.get('size')),
-                                "size_bytes": int(item.get('size', 0)),
-                                "modified": datetime.fromisoformat(
-                                    item['modifiedTime'].replace('Z', '+00:00')
-                                ).strftime("%Y-%m-%d"),
-                                "modified_timestamp": datetime.fromisoformat(
-                                    item['modifiedTime'].replace('Z', '+00:00')
-                                ).timestamp(),
-                                "path": "/".join(path_parts),
-                                "full_path": item['webViewLink'],
-                                "hash": None  # Drive não fornece hash
-                            }
-                            
-                            # Adiciona nota se existir
-                            note_key = f"{discipline}_{item['name']}"
-                            if note_key in self.notes:
-                                file_info["notes"] = self.notes[note_key]
-                            
-                            files_by_discipline[discipline].append(file_info)
-                            
-                            # Adiciona a pasta atual para esta disciplina
-                            if path_parts:
-                                folders_by_discipline[discipline].add(path_parts[-1])
-                
-                page_token = results.get('nextPageToken')
-                if not page_token:
-                    break
-                    
+            return self.backend.start_token()
         except Exception as e:
-            logger.error(f"Erro ao listar arquivos na pasta {folder_id}: {e}")
+            logger.error(f"Erro ao obter token de mudanças: {e}")
+            return None
+
+    def apply_changes(self, changes: List[dict], changed_files: Optional[set] = None,
+                      changed_folders: Optional[set] = None) -> int:
+        """Aplica as mudanças ao índice. Retorna quantas entradas foram alteradas.
         
-        # Converte sets para listas
-        for disc_key in folders_by_discipline:
-            folders_by_discipline[disc_key] = list(folders_by_discipline[disc_key])
-            
-        return files_by_discipline, folders_by_discipline
+        ``changed_files``/``changed_folders``, se informados, recebem os ids alterados.
+        """
+        folders, files = self.index["folders"], self.index["files"]
+        changed_files = set() if changed_files is None else changed_files
+        changed_folders = set() if changed_folders is None else changed_folders
+        applied = 0
+        pending = []
+        
+        for change in changes:
+            file_id = change.get('fileId')
+            item = change.get('file')
+            if change.get('removed') or not item or item.get('trashed'):
+                if folders.pop(file_id, None) is not None:
+                    changed_folders.add(file_id)
+                    applied += 1
+                elif files.pop(file_id, None) is not None:
+                    changed_files.add(file_id)
+                    applied += 1
+            else:
+                pending.append(item)
+        
+        # Um item só entra no índice se o pai já é conhecido; pastas novas
+        # podem chegar depois dos seus filhos no mesmo lote, então repete.
+        progress = True
+        while pending and progress:
+            progress = False
+            deferred = []
+            for item in pending:
+                item_id = item['id']
+                parent_id = (item.get('parents') or [None])[0]
+                tracked = item_id in folders or item_id in files
+                if not (tracked or parent_id == self.root_folder_id or parent_id in folders):
+                    deferred.append(item)
+                    continue
+                
+                progress = True
+                applied += 1
+                if item['mimeType'] == FOLDER_MIME_TYPE:
+                    folders[item_id] = [item['name'], parent_id]
+                    changed_folders.add(item_id)
+                elif self._is_relevant(item):
+                    files[item_id] = FileEntry.from_item(item, parent_id).keep_classification(files.get(item_id))
+                    changed_files.add(item_id)
+                elif files.pop(item_id, None) is not None:
+                    changed_files.add(item_id)
+            pending = deferred
+        
+        return applied
 
-    def scan_all_disciplines(self):
-        """Escaneia toda a pasta de projetos e organiza por disciplina"""
-        result = {
-            "last_scan": datetime.now().isoformat(),
-            "disciplines": {}
-        }
+    def needs_full_scan(self) -> bool:
+        """Indica se o próximo scan deve percorrer a árvore inteira."""
+        if self.page_token is None or self.last_full_scan is None:
+            return True
+        return time.time() - self.last_full_scan >= self.full_scan_interval
+
+    def scan_all_disciplines(self, on_file=None, on_partial=None):
+        """Escaneia toda a pasta de projetos e organiza por disciplina.
         
-        if not self.service:
-            logger.error("Serviço do Drive não está disponível. Abortando o scan.")
-            return result
+        Os arquivos passam pelo pipeline à medida que as pastas são listadas;
+        ``on_file``/``on_partial`` são repassados para ``_run_pipeline``.
+        """
+        if not self.available:
+            logger.error("Fonte dos arquivos não está disponível. Abortando o scan.")
+            return {"last_scan": datetime.now().isoformat(), "disciplines": {}}
 
         logger.info("Iniciando scan recursivo da pasta de projetos...")
+        self.progress = {"phase": "listing", "mode": "full", "strategy": self.scan_strategy}
         
-        # Faz o scan recursivo começando da pasta raiz
-        files_by_disc, folders_by_disc = self.list_files_recursive(self.root_folder_id)
+        # O token é obtido antes de percorrer a árvore para que mudanças feitas
+        # durante o scan apareçam no próximo scan incremental.
+        page_token = self.get_start_page_token()
+        index = {"folders": {}, "files": {}}
+        accumulator = self._run_pipeline(self._traverse(self.root_folder_id, index), on_file, on_partial)
+        self.index = index
+        self.page_token = page_token
+        if self.progress.get("listing_errors"):
+            # Subárvore faltando: o incremental não a traria de volta, então o próximo scan é completo
+            logger.warning(f"{self.progress['listing_errors']} pasta(s) não listada(s); "
+                           f"o próximo scan será completo de novo.")
+            self.last_full_scan = None
+        else:
+            self.last_full_scan = time.time()
         
-        # Organiza os resultados
-        for disc_key, disc_info in self.config["disciplines"].items():
-            files = files_by_disc[disc_key]
-            folders = folders_by_disc[disc_key]
-            total_size = sum(f['size_bytes'] for f in files)
-            
-            result["disciplines"][disc_key] = {
-                "name": disc_info["name"],
-                "path": self.root_folder_id,  # Pasta raiz
-                "files": files,
-                "folders": folders,
-                "total_files": len(files),
-                "total_size": self.format_size(total_size),
-                "total_size_bytes": total_size
-            }
-            
-            logger.info(f"{disc_info['name']}: {len(files)} arquivos ({self.format_size(total_size)})")
+        self.progress["phase"] = "assembling"
+        files_by_disc, folders_by_disc = self._last_result = accumulator.finish()
+        return self._assemble_result(files_by_disc, folders_by_disc)
+
+    def scan_incremental(self, on_file=None, on_partial=None):
+        """Aplica ao índice apenas as mudanças desde o último scan."""
+        if not self.available:
+            logger.error("Fonte dos arquivos não está disponível. Abortando o scan.")
+            return {"last_scan": datetime.now().isoformat(), "disciplines": {}}
+        
+        logger.info("Iniciando scan incremental (API de mudanças)...")
+        self.progress = {"phase": "listing_changes", "mode": "incremental"}
+        try:
+            changes, new_token = self.backend.list_changes(self.page_token)
+        except BackendError as e:
+            # Token expirado/inválido: só resta percorrer a árvore de novo
+            logger.warning(f"Falha na API de mudanças ({e}); executando scan completo.")
+            return self.scan_all_disciplines(on_file, on_partial)
+        
+        changed_files, changed_folders = set(), set()
+        applied = self.apply_changes(changes, changed_files, changed_folders)
+        self.page_token = new_token
+        logger.info(f"{len(changes)} mudanças recebidas, {applied} aplicadas ao índice.")
+        self.progress.update(phase="classifying", changes_received=len(changes), changes_applied=applied)
+        
+        if self._last_result is None or self._fingerprints is None:
+            # Primeiro scan do processo: não há registros anteriores para reaproveitar
+            files_by_disc, folders_by_disc = self._last_result = self.build_disciplines(self.index, self.root_folder_id)
+        else:
+            files_by_disc, folders_by_disc = self._last_result = self._update_disciplines(changed_files, changed_folders)
+        return self._assemble_result(files_by_disc, folders_by_disc)
+
+    def _affected_files(self, changed_files: set, changed_folders: set) -> set:
+        """Arquivos alterados mais os que estão abaixo de uma pasta alterada (renomeada, movida ou removida)."""
+        if not changed_folders:
+            return set(changed_files)
+        children = defaultdict(list)
+        for folder_id, (_, parent_id) in self.index["folders"].items():
+            children[parent_id].append(folder_id)
+        affected_folders = set()
+        pending = list(changed_folders)
+        while pending:
+            folder_id = pending.pop()
+            if folder_id not in affected_folders:
+                affected_folders.add(folder_id)
+                pending.extend(children.get(folder_id, ()))
+        # Arquivos de uma pasta removida continuam no índice com o id dela como pai:
+        # entram aqui e saem do resultado ao não resolverem mais o caminho
+        return changed_files | {
+            file_id for file_id, entry in self.index["files"].items() if entry.parent in affected_folders
+        }
+
+    def _update_disciplines(self, changed_files: set, changed_folders: set) -> Tuple[Dict[str, List], Dict[str, List]]:
+        """Resultado do scan incremental a partir do anterior, refazendo só os arquivos afetados.
+        
+        O diff para a versão anterior sai da comparação dos registros antigos e
+        novos desses arquivos (``_pending_changes``), sem percorrer o resto.
+        """
+        folders, files = self.index["folders"], self.index["files"]
+        affected = self._affected_files(changed_files, changed_folders)
+        self.progress["files_classified"] = 0
+        subset = {"folders": folders, "files": {fid: files[fid] for fid in affected if fid in files}}
+        stream = self._record_stream(self._classify_stream(self._index_stream(subset, self.root_folder_id, [])))
+        new_records = {info["id"]: (discipline, info) for discipline, info, _, _ in stream}
+        
+        previous_files, previous_folders = self._last_result
+        old_records = {}
+        files_by_disc, folders_by_disc = {}, {}
+        for disc_key, disc_files in previous_files.items():
+            kept = []
+            for info in disc_files:
+                if info["id"] in affected:
+                    old_records[info["id"]] = (disc_key, info)
+                else:
+                    kept.append(info)
+            files_by_disc[disc_key] = kept
+        
+        changes = {}
+        
+        def bucket(disc_key):
+            if disc_key not in changes:
+                changes[disc_key] = {"added": [], "modified": [], "removed": []}
+            return changes[disc_key]
+        
+        fingerprints = self._fingerprints
+        for file_id, (disc_key, info) in new_records.items():
+            old = old_records.get(file_id)
+            if old is None or old[0] != disc_key:
+                bucket(disc_key)["added"].append(info)
+            elif old[1] != info:
+                bucket(disc_key)["modified"].append(info)
+            else:
+                info = old[1]  # Sem mudança: mantém o registro já publicado
+            files_by_disc[disc_key].append(info)
+            fingerprints[file_id] = (disc_key, hash(tuple(info.items())))
+        for file_id, (disc_key, _) in old_records.items():
+            current = new_records.get(file_id)
+            if current is None or current[0] != disc_key:
+                bucket(disc_key)["removed"].append(file_id)
+            if current is None:
+                fingerprints.pop(file_id, None)
+        self._pending_changes = changes
+        
+        # Só as disciplinas com registros afetados são reordenadas e têm as pastas recalculadas
+        memo = {}
+        touched = {disc_key for disc_key, _ in old_records.values()} | {disc_key for disc_key, _ in new_records.values()}
+        for disc_key in files_by_disc:
+            if disc_key not in touched:
+                files_by_disc[disc_key] = previous_files[disc_key]
+                folders_by_disc[disc_key] = previous_folders[disc_key]
+                continue
+            disc_files = files_by_disc[disc_key]
+            disc_files.sort(key=lambda f: (f['path'], f['name']))
+            # Mesma regra do DisciplineAccumulator: a pasta do primeiro nível acima do arquivo
+            first_level = set()
+            for parent in {files[info["id"]].parent for info in disc_files}:
+                path_parts = self._resolve_path(parent, self.root_folder_id, folders, memo)
+                if path_parts:
+                    first_level.add(path_parts[0])
+            folders_by_disc[disc_key] = sorted(first_level)
+        
+        logger.info(f"Scan incremental: {len(affected)} arquivos refeitos, "
+                    f"{self.progress['files_classified']} classificados.")
+        return files_by_disc, folders_by_disc
+
+    def _fingerprint_files(self, data: dict) -> Dict[str, Tuple[str, int]]:
+        """Mapeia id do arquivo -> (disciplina, hash do registro)."""
+        return {
+            info["id"]: (disc_key, hash(tuple(info.items())))
+            for disc_key, disc in data.get("disciplines", {}).items()
+            for info in disc.get("files", [])
+        }
+
+    def set_baseline(self, data: dict):
+        """Usa um resultado já publicado (ex.: o snapshot salvo) como base para o próximo diff."""
+        self._fingerprints = self._fingerprint_files(data)
+        self.scan_version = max(self.scan_version, data.get("version", 0))
+
+    def compute_diff(self, data: dict) -> Optional[dict]:
+        """Arquivos adicionados/removidos/modificados por disciplina desde o último resultado.
+        
+        Retorna None quando não há base para comparar (primeiro scan do processo).
+        Mudar de disciplina conta como remoção de uma e adição na outra.
+        """
+        fingerprints = self._fingerprint_files(data)
+        previous = self._fingerprints
+        self._fingerprints = fingerprints
+        if previous is None:
+            return None
         
-        return result
+        changes = {}
+        
+        def bucket(disc_key):
+            if disc_key not in changes:
+                changes[disc_key] = {"added": [], "modified": [], "removed": []}
+            return changes[disc_key]
+        
+        for disc_key, disc in data["disciplines"].items():
+            for info in disc["files"]:
+                old = previous.get(info["id"])
+                if old is None or old[0] != disc_key:
+                    bucket(disc_key)["added"].append(info)
+                elif old[1] != fingerprints[info["id"]][1]:
+                    bucket(disc_key)["modified"].append(info)
+        
+        for file_id, (disc_key, _) in previous.items():
+            current = fingerprints.get(file_id)
+            if current is None or current[0] != disc_key:
+                bucket(disc_key)["removed"].append(file_id)
+        
+        return changes
 
-    def run_once(self):
-        logger.info("Iniciando scan do Google Drive...")
-        data = self.scan_all_disciplines()
+    def _update_version(self, data: dict):
+        """Incrementa a versão se o conteúdo mudou e registra o diff em ``last_diff``."""
+        # O scan incremental já comparou os arquivos afetados; senão compara o resultado inteiro
+        changes, self._pending_changes = self._pending_changes, None
+        if changes is None:
+            changes = self.compute_diff(data)
+        if changes is None or changes:
+            base_version = self.scan_version
+            self.scan_version += 1
+            self.last_diff = None if changes is None else {
+                "base_version": base_version,
+                "version": self.scan_version,
+                "disciplines": changes
+            }
+        else:
+            self.last_diff = None
+        data["version"] = self.scan_version
+
+    def run_once(self, full: Optional[bool] = None, on_file=None, on_partial=None):
+        """Executa um scan. Por padrão é incremental, com reconciliação completa periódica.
+        
+        Em scans completos, ``on_file``/``on_partial`` acompanham o resultado enquanto ele é montado.
+        """
+        if not self._state_loaded:
+            self.load_state()
+        if full is None:
+            full = self.needs_full_scan()
+        logger.info(f"Iniciando scan {'completo' if full else 'incremental'}...")
+        if full:
+            data = self.scan_all_disciplines(on_file, on_partial)
+        else:
+            data = self.scan_incremental(on_file, on_partial)
+        if self.available:
+            self._update_version(data)
+            self.save_state()
         self.save_notes()
-        logger.info("Scan do Google Drive completo.")
+        logger.info("Scan completo.")
         return data
 
 
@@ -0,0 +1,99 @@
+"""
+Push de atualizações para o dashboard (Server-Sent Events em /api/events)
+
+Cada scan publicado vira um único evento, codificado uma vez e compartilhado
+por todas as conexões. Em vez de uma fila por cliente, os clientes aguardam o
+mesmo Future ("próximo evento"), que resolve com o evento e o Future seguinte:
+publicar custa O(1) e acorda todos juntos, nenhum cliente pula um evento, e
+conexões ociosas só custam um heartbeat de tempos em tempos.
+
+Cliente que reconecta com Last-Event-ID antigo recebe logo o evento mais
+recente; se o ``base_version`` não bate com a versão que ele tem, ele busca
+/api/files/changes.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Optional
+
+HEARTBEAT_SECONDS = 15.0
+RETRY_MILLISECONDS = 5000
+# Deltas maiores que isso não vão no evento: o cliente busca /api/files/changes
+MAX_EVENT_CHANGES = 500
+
+
+def format_event(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def count_changes(changes: dict) -> int:
+    return sum(len(c["added"]) + len(c["modified"]) + len(c["removed"]) for c in changes.values())
+
+
+class EventBroadcaster:
+    """Distribui o último evento de scan para todas as conexões SSE."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next: Optional[asyncio.Future] = None
+        self._closed = False
+        self.version = 0
+        self.message: Optional[bytes] = None  # Último evento já codificado
+        self.clients = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Associa ao event loop do servidor (chamado no lifespan)."""
+        self._loop = loop
+        self._next = loop.create_future()
+
+    def publish(self, version: int, payload: dict):
+        """Publica o evento de uma nova versão. Pode ser chamado de qualquer thread."""
+        message = format_event("scan", payload, event_id=version)
+        self.version = version  # Já publicada, mesmo antes de chegar ao event loop
+        if self._loop is None:
+            self.message = message
+            return
+        self._loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message: bytes):
+        if self._closed:
+            return
+        self.message = message
+        waiting, self._next = self._next, self._loop.create_future()
+        waiting.set_result((message, self._next))
+
+    def close(self):
+        """Encerra as conexões abertas (desligamento do servidor)."""
+        self._closed = True
+        if self._next is not None and not self._next.done():
+            self._next.set_result((None, None))
+
+    async def stream(self, last_event_id: Optional[int] = None,
+                     is_disconnected: Optional[Callable] = None) -> AsyncIterator[bytes]:
+        """Corpo da resposta SSE de um cliente."""
+        self.clients += 1
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n".encode()
+            # Reconexão com versão antiga: entrega logo o evento mais recente
+            if last_event_id is not None and self.message is not None and last_event_id < self.version:
+                yield self.message
+            waiting = self._next
+            while waiting is not None:
+                try:
+                    message, following = await asyncio.wait_for(asyncio.shield(waiting), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        break
+                    yield b": ping\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+                waiting = following
+        finally:
+            self.clients -= 1
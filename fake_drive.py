@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Fake em memória da API do Google Drive v3 - usado nos benchmarks, sem credenciais.
+
+Implementa só o que o DriveBackend usa: ``files().list`` (consultas por pasta
+``'<id>' in parents and trashed = false`` e a listagem plana ``trashed = false``)
+e ``changes().getStartPageToken()`` / ``changes().list()``. A árvore pode ser
+gerada sinteticamente ou gravada de um Drive real e reproduzida. Latência por
+chamada, tamanho máximo de página e erros 429 (para exercitar o backoff) são
+configuráveis.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+PARENT_QUERY = re.compile(r"'([^']+)' in parents")
+
+DISCIPLINE_FOLDERS = ["ARQUITETURA", "ESTRUTURA", "HIDRAULICA", "METALICA", "ELETRICA", "GERAL"]
+FILE_PREFIXES = ["ARQ", "EST", "HID", "MET", "ELE", "GER"]
+FILE_EXTENSIONS = ["pdf", "dwg", "dwg", "pdf", "xlsx", "docx", "png", "txt"]
+
+
+def _http_error(status: int, message: str) -> HttpError:
+    resp = httplib2.Response({"status": status})
+    return HttpError(resp, json.dumps({"error": {"code": status, "message": message}}).encode())
+
+
+class _Request:
+    """Equivalente ao HttpRequest: só executa (com latência simulada) no ``execute()``."""
+
+    def __init__(self, service, method, fn):
+        self._service = service
+        self._method = method
+        self._fn = fn
+
+    def execute(self):
+        self._service._record_call(self._method)
+        if self._service.latency:
+            time.sleep(self._service.latency)
+        if self._service._throttle():
+            raise _http_error(429, "Rate Limit Exceeded")
+        return self._fn()
+
+
+class _FilesResource:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, q="", pageSize=100, fields=None, pageToken=None, **kwargs):
+        return _Request(self._service, "files.list",
+                        lambda: self._service._list_files(q, pageSize, pageToken))
+
+
+class _ChangesResource:
+    def __init__(self, service):
+        self._service = service
+
+    def getStartPageToken(self, **kwargs):
+        return _Request(self._service, "changes.getStartPageToken",
+                        lambda: {"startPageToken": str(len(self._service.changes_log))})
+
+    def list(self, pageToken, pageSize=100, **kwargs):
+        return _Request(self._service, "changes.list",
+                        lambda: self._service._list_changes(pageToken, pageSize))
+
+
+class FakeDriveService:
+    """Serviço do Drive em memória. Thread-safe para leitura, como o pool do scanner exige.
+
+    ``error_rate`` é a fração das chamadas que falha com HTTP 429 (sorteio com
+    ``seed``, reproduzível); ``throttled`` conta as falhas injetadas.
+    """
+
+    def __init__(self, items: List[dict], latency: float = 0.0, max_page_size: int = 1000,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.error_rate = error_rate
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self.items: Dict[str, dict] = {}
+        self.children: Dict[str, List[str]] = defaultdict(list)
+        self.changes_log: List[dict] = []
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        for item in items:
+            self._insert(item)
+
+    # --- Recursos da API ---
+    def files(self):
+        return _FilesResource(self)
+
+    def changes(self):
+        return _ChangesResource(self)
+
+    # --- Mutações (registradas na API de mudanças) ---
+    def add_item(self, item: dict):
+        with self._lock:
+            self._insert(item)
+            self.changes_log.append({"fileId": item["id"], "removed": False, "file": item})
+
+    def update_item(self, item_id: str, **fields):
+        with self._lock:
+            item = self._remove(item_id)
+            item = {**item, **fields}
+            self._insert(item)
+            self.changes_log.append({"fileId": item_id, "removed": False, "file": item})
+
+    def remove_item(self, item_id: str):
+        with self._lock:
+            self._remove(item_id)
+            self.changes_log.append({"fileId": item_id, "removed": True})
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+            self.throttled = 0
+
+    # --- Gravação / reprodução ---
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"items": list(self.items.values())}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "FakeDriveService":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)["items"], **kwargs)
+
+    # --- Internos ---
+    def _insert(self, item: dict):
+        self.items[item["id"]] = item
+        for parent_id in item.get("parents", []):
+            self.children[parent_id].append(item["id"])
+
+    def _remove(self, item_id: str) -> dict:
+        item = self.items.pop(item_id)
+        for parent_id in item.get("parents", []):
+            self.children[parent_id].remove(item_id)
+        return item
+
+    def _record_call(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+
+    def _throttle(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            throttled = self._rng.random() < self.error_rate
+            self.throttled += throttled
+        return throttled
+
+    def _list_files(self, q: str, page_size: int, page_token: Optional[str]) -> dict:
+        match = PARENT_QUERY.search(q or "")
+        with self._lock:
+            if match:
+                ids = self.children.get(match.group(1), [])
+            else:
+                ids = list(self.items)
+            page_size = min(page_size or 100, self.max_page_size)
+            start = int(page_token or 0)
+            page = [self.items[i] for i in ids[start:start + page_size]]
+            page = [item for item in page if not item.get("trashed")]
+            response = {"files": page}
+            if start + page_size < len(ids):
+                response["nextPageToken"] = str(start + page_size)
+        return response
+
+    def _list_changes(self, page_token: str, page_size: int) -> dict:
+        with self._lock:
+            start = int(page_token)
+            end = min(len(self.changes_log), start + min(page_size, self.max_page_size))
+            response = {"changes": self.changes_log[start:end]}
+            if end < len(self.changes_log):
+                response["nextPageToken"] = str(end)
+            else:
+                response["newStartPageToken"] = str(end)
+        return response
+
+
+def generate_tree(depth: int = 3, fanout: int = 4, files_per_folder: int = 10,
+                  root_id: str = "root", seed: int = 0) -> List[dict]:
+    """Gera uma árvore sintética determinística no formato de itens do Drive.
+
+    O primeiro nível usa nomes de disciplina (ARQUITETURA, ESTRUTURA...) como
+    na pasta real do projeto; os níveis abaixo são pavimentos/revisões.
+    """
+    rng = random.Random(seed)
+    base_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    items = []
+    counter = 0
+
+    def next_id(prefix):
+        nonlocal counter
+        counter += 1
+        return f"{prefix}{counter:07d}"
+
+    def add_files(folder_id, code):
+        for _ in range(files_per_folder):
+            file_id = next_id("f")
+            ext = rng.choice(FILE_EXTENSIONS)
+            modified = base_time + timedelta(minutes=rng.randrange(0, 525600))
+            items.append({
+                "id": file_id,
+                "name": f"{code}-{counter:05d}-R{rng.randrange(0, 5):02d}.{ext}",
+                "mimeType": "application/octet-stream",
+                "modifiedTime": modified.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "size": str(rng.randrange(10_000, 50_000_000)),
+                "webViewLink": f"https://drive.google.com/file/d/{file_id}/view?usp=drivesdk",
+                "parents": [folder_id]
+            })
+
+    def add_folder(parent_id, level, code):
+        add_files(parent_id, code)
+        if level >= depth:
+            return
+        for i in range(fanout):
+            folder_id = next_id("d")
+            if level == 0:
+                name = DISCIPLINE_FOLDERS[i % len(DISCIPLINE_FOLDERS)]
+                child_code = FILE_PREFIXES[i % len(FILE_PREFIXES)]
+            else:
+                name = f"PAVIMENTO {i + 1:02d}" if level == 1 else f"REV{i:02d}"
+                child_code = code
+            items.append({"id": folder_id, "name": name, "mimeType": FOLDER_MIME_TYPE, "parents": [parent_id]})
+            add_folder(folder_id, level + 1, child_code)
+
+    add_folder(root_id, 0, "GER")
+    return items
+
+
+def record_drive(service, root_id: str, path: str) -> int:
+    """Grava em ``path`` a árvore real sob ``root_id`` para reproduzir com FakeDriveService.load()."""
+    fields = "nextPageToken, files(id, name, mimeType, modifiedTime, size, webViewLink, parents)"
+    items = []
+    pending = [root_id]
+    while pending:
+        folder_id = pending.pop()
+        page_token = None
+        while True:
+            results = service.files().list(
+                q=f"'{folder_id}' in parents and trashed = false",
+                pageSize=1000, fields=fields, pageToken=page_token
+            ).execute()
+            for item in results.get('files', []):
+                items.append(item)
+                if item['mimeType'] == FOLDER_MIME_TYPE:
+                    pending.append(item['id'])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+    FakeDriveService(items).save(path)
+    return len(items)
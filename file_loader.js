@@ -7,7 +7,8 @@ const FILE_LOADER_CONFIG = {
     apiUrl: window.location.hostname === 'localhost'
         ? 'http://localhost:8000'
         : 'https://engdaniel.org',  // Mudando para o domínio correto
-    refreshInterval: 30000, // 30 segundos
+    refreshInterval: 30000, // 30 segundos (só sem /api/events)
+    eventsRetryInterval: 5000, // Reconexão a /api/events após queda
     autoRefresh: true
 };
 
@@ -20,10 +21,18 @@ function getAuthHeaders() {
     };
 }
 
+// Versão do snapshot já carregado (0 = nenhum ainda)
+let fileDataVersion = 0;
+
 // Função para carregar dados da API
+// Depois da primeira carga busca só as mudanças desde a versão conhecida;
+// se ela for antiga demais o servidor devolve o snapshot completo.
 async function loadFileData() {
     try {
-        const response = await fetch(`${FILE_LOADER_CONFIG.apiUrl}/api/files`, {
+        const url = fileDataVersion
+            ? `${FILE_LOADER_CONFIG.apiUrl}/api/files/changes?since=${fileDataVersion}`
+            : `${FILE_LOADER_CONFIG.apiUrl}/api/files`;
+        const response = await fetch(url, {
             headers: getAuthHeaders()
         });
         
@@ -39,9 +48,12 @@ async function loadFileData() {
         }
         
         const data = await response.json();
+        const hasChanges = data.disciplines || Object.keys(data.changes || {}).length > 0;
         
         // Atualizar o objeto fileSystem global
-        if (data.disciplines) {
+        if (data.changes) {
+            applyFileChanges(data);
+        } else if (data.disciplines) {
             Object.keys(data.disciplines).forEach(key => {
                 if (fileSystem[key]) {
                     fileSystem[key] = {
@@ -55,8 +67,12 @@ async function loadFileData() {
             });
         }
         
+        if (data.version !== undefined) {
+            fileDataVersion = data.version;
+        }
+        
         // Se estiver visualizando uma disciplina, recarregar a tabela
-        if (currentDiscipline) {
+        if (currentDiscipline && hasChanges) {
             loadFiles(currentDiscipline);
         }
         
@@ -71,6 +87,102 @@ async function loadFileData() {
     }
 }
 
+// Aplica um delta de /api/files/changes ao fileSystem
+function applyFileChanges(delta) {
+    Object.keys(delta.changes).forEach(key => {
+        if (!fileSystem[key]) return;
+        
+        const changes = delta.changes[key];
+        const upserts = [...changes.added, ...changes.modified];
+        const dropped = new Set([...changes.removed, ...upserts.map(f => f.id)]);
+        const files = (fileSystem[key].files || [])
+            .filter(f => !dropped.has(f.id))
+            .concat(upserts);
+        
+        fileSystem[key] = {
+            ...fileSystem[key],
+            ...(delta.summary[key] || {}),
+            files
+        };
+        updateDisciplineStats(key, fileSystem[key]);
+    });
+}
+
+// Eventos do servidor (SSE): cada scan publicado chega aqui, sem polling
+let fileEvents = null;
+let fileEventsPolling = null;
+
+function connectFileEvents() {
+    if (!window.EventSource) return false;
+    openFileEvents();
+    return true;
+}
+
+// O token de acesso não vai na URL (ficaria nos logs de acesso): cada conexão usa um ticket novo
+async function openFileEvents() {
+    let ticket;
+    try {
+        const response = await fetch(`${FILE_LOADER_CONFIG.apiUrl}/api/events/ticket`, {
+            method: 'POST',
+            headers: getAuthHeaders()
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        ticket = (await response.json()).ticket;
+    } catch (error) {
+        console.error('[FILE_LOADER] Sem ticket para /api/events - usando polling:', error);
+        startPolling();
+        return;
+    }
+    
+    fileEvents = new EventSource(
+        `${FILE_LOADER_CONFIG.apiUrl}/api/events?ticket=${encodeURIComponent(ticket)}`
+    );
+    
+    // Reconectou: busca o que mudou enquanto estava desconectado
+    fileEvents.addEventListener('open', () => {
+        if (fileDataVersion) loadFileData();
+    });
+    
+    fileEvents.addEventListener('scan', (event) => {
+        handleScanEvent(JSON.parse(event.data));
+    });
+    
+    fileEvents.addEventListener('error', () => {
+        updateSyncIndicator('error');
+        // O ticket já foi usado: a reconexão automática do navegador seria recusada
+        fileEvents.close();
+        setTimeout(openFileEvents, FILE_LOADER_CONFIG.eventsRetryInterval);
+    });
+}
+
+function isFileEventsConnected() {
+    return fileEvents !== null && fileEvents.readyState === EventSource.OPEN;
+}
+
+function startPolling() {
+    if (FILE_LOADER_CONFIG.autoRefresh && !fileEventsPolling) {
+        fileEventsPolling = setInterval(loadFileData, FILE_LOADER_CONFIG.refreshInterval);
+    }
+}
+
+// Evento de scan: aplica o delta se ele parte da versão que temos; senão busca as mudanças
+function handleScanEvent(event) {
+    if (event.version === fileDataVersion) return;
+    
+    if (event.full || event.base_version !== fileDataVersion) {
+        loadFileData();
+        return;
+    }
+    
+    applyFileChanges(event);
+    fileDataVersion = event.version;
+    
+    if (currentDiscipline && Object.keys(event.changes).length > 0) {
+        loadFiles(currentDiscipline);
+    }
+    updateSyncIndicator('synced');
+}
+
 // Função para atualizar indicador de sincronização
 function updateSyncIndicator(status) {
     const syncIndicator = document.getElementById('syncStatus');
@@ -260,9 +372,9 @@ document.addEventListener('DOMContentLoaded', () => {
     setTimeout(() => {
         loadFileData();
         
-        // Auto-refresh se habilitado
-        if (FILE_LOADER_CONFIG.autoRefresh) {
-            setInterval(loadFileData, FILE_LOADER_CONFIG.refreshInterval);
+        // Atualizações por push; polling só se o navegador não tiver EventSource
+        if (!connectFileEvents()) {
+            startPolling();
         }
     }, 500);
 });
@@ -0,0 +1,184 @@
+"""
+Consulta paginada dos arquivos de uma disciplina (/api/files/{discipline})
+
+A cada scan são montados índices já ordenados por cada chave de ordenação,
+no geral e por tipo de arquivo. Uma consulta só percorre os itens da página:
+o cursor guarda a chave do último item devolvido e a retomada é uma busca
+binária no índice, então ele continua válido mesmo após um novo scan.
+"""
+
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Chaves de ordenação; o id no final desempata e torna a ordem total
+SORT_KEYS: Dict[str, Callable[[dict], tuple]] = {
+    "name": lambda f: (f["name"].casefold(), f["id"]),
+    "modified_timestamp": lambda f: (f["modified_timestamp"], f["id"]),
+    "size_bytes": lambda f: (f["size_bytes"], f["id"]),
+    "type": lambda f: (f["type"], f["name"].casefold(), f["id"]),
+}
+
+
+class QueryError(ValueError):
+    """Parâmetro de consulta inválido (vira HTTP 400 na API)."""
+
+
+def encode_cursor(sort: str, order: str, key: tuple) -> str:
+    """Cursor opaco: a ordenação em que foi gerado e a chave do último item."""
+    raw = json.dumps([sort, order, *key], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> tuple:
+    """Chave guardada no cursor; QueryError se ele é inválido ou de outra ordenação."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, *key = json.loads(raw)
+    except Exception:
+        raise QueryError("Cursor inválido")
+    if (cursor_sort, cursor_order) != (sort, order):
+        # A chave de outra ordenação não é comparável com este índice (ex.: nome x tamanho)
+        raise QueryError(f"Cursor gerado para sort={cursor_sort}&order={cursor_order}")
+    return tuple(key)
+
+
+def parse_day(value: Optional[str]) -> Optional[float]:
+    """Converte 'YYYY-MM-DD' no timestamp da meia-noite UTC (mesma base do campo 'modified')."""
+    if not value:
+        return None
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"Data inválida: {value} (use YYYY-MM-DD)")
+    return datetime.combine(day, dt_time.min, tzinfo=timezone.utc).timestamp()
+
+
+class DisciplineIndex:
+    """Ordenações pré-computadas (posições em ``files``) de uma disciplina."""
+
+    def __init__(self, files: List[dict]):
+        self.files = files
+        self.orders: Dict[str, List[int]] = {}
+        self.orders_by_type: Dict[str, Dict[str, List[int]]] = {}
+
+        for sort_key, key_fn in SORT_KEYS.items():
+            order = sorted(range(len(files)), key=lambda i: key_fn(files[i]))
+            self.orders[sort_key] = order
+            for position in order:
+                file_type = files[position]["type"]
+                self.orders_by_type.setdefault(file_type, {}).setdefault(sort_key, []).append(position)
+
+    def query(self, sort: str = "name", order: str = "asc", file_type: Optional[str] = None,
+              folder: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+              limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None) -> dict:
+        if sort not in SORT_KEYS:
+            raise QueryError(f"Ordenação inválida: {sort} (use {', '.join(SORT_KEYS)})")
+        if order not in ("asc", "desc"):
+            raise QueryError("order deve ser 'asc' ou 'desc'")
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        key_fn = SORT_KEYS[sort]
+        files = self.files
+        position_key = lambda i: key_fn(files[i])
+
+        if file_type:
+            positions = self.orders_by_type.get(file_type.lower(), {}).get(sort, [])
+        else:
+            positions = self.orders[sort]
+
+        ts_from = parse_day(date_from)
+        ts_to = parse_day(date_to)
+        if ts_to is not None:
+            ts_to += timedelta(days=1).total_seconds()  # Data final inclusiva
+
+        # Intervalo [lo, hi) do índice a percorrer
+        lo, hi = 0, len(positions)
+        date_filter = ts_from is not None or ts_to is not None
+        if date_filter and sort == "modified_timestamp":
+            # Ordenado por data: o filtro vira uma busca binária
+            if ts_from is not None:
+                lo = bisect_left(positions, (ts_from,), key=position_key)
+            if ts_to is not None:
+                hi = bisect_left(positions, (ts_to,), key=position_key)
+            date_filter = False
+
+        if cursor:
+            cursor_key = decode_cursor(cursor, sort, order)
+            try:
+                if order == "asc":
+                    lo = max(lo, bisect_right(positions, cursor_key, lo, hi, key=position_key))
+                else:
+                    hi = min(hi, bisect_left(positions, cursor_key, lo, hi, key=position_key))
+            except TypeError:
+                raise QueryError("Cursor inválido")  # Chave com tipos que não batem com a ordenação
+
+        folder_prefix = folder.strip("/") if folder else None
+
+        def matches(info):
+            if folder_prefix is not None:
+                path = info["path"]
+                if path != folder_prefix and not path.startswith(folder_prefix + "/"):
+                    return False
+            if date_filter:
+                ts = info["modified_timestamp"]
+                if (ts_from is not None and ts < ts_from) or (ts_to is not None and ts >= ts_to):
+                    return False
+            return True
+
+        items = []
+        has_more = False
+        indices = range(lo, hi) if order == "asc" else range(hi - 1, lo - 1, -1)
+        for i in indices:
+            info = files[positions[i]]
+            if not matches(info):
+                continue
+            if len(items) == limit:
+                has_more = True
+                break
+            items.append(info)
+
+        # Total só quando sai de graça do índice (sem filtros que exigem varredura)
+        total = None
+        if folder_prefix is None and not date_filter and not cursor:
+            total = hi - lo
+
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(sort, order, key_fn(items[-1])) if has_more else None,
+            "total": total
+        }
+
+
+class FileQueryIndex:
+    """Índices de consulta de todas as disciplinas; reconstruídos a cada scan publicado."""
+
+    def __init__(self):
+        self.version = 0
+        self._disciplines: Dict[str, DisciplineIndex] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, data: dict):
+        indexes = {
+            disc_key: DisciplineIndex(disc.get("files", []))
+            for disc_key, disc in data.get("disciplines", {}).items()
+        }
+        with self._lock:
+            self._disciplines = indexes
+            self.version = data.get("version", 0)
+
+    def query(self, discipline: str, **params) -> Optional[dict]:
+        """Executa a consulta; None se a disciplina não existe."""
+        with self._lock:
+            index = self._disciplines.get(discipline)
+            version = self.version
+        if index is None:
+            return None
+        result = index.query(**params)
+        return {"discipline": discipline, "version": version, **result}
@@ -0,0 +1,94 @@
+"""
+Verificação local dos ID tokens do Google (login em /api/auth/google)
+
+id_token.verify_oauth2_token com um ``requests.Request()`` novo baixa os
+certificados do Google a cada login. CachingRequest é um transporte do
+google-auth que reaproveita uma única sessão HTTP (conexão keep-alive) e guarda
+as respostas de GET enquanto o Cache-Control delas permitir (max-age menos
+Age). Depois da primeira busca, a verificação não sai do processo.
+
+Se o token usa uma chave que não está nos certificados em cache (rotação), a
+verificação busca os certificados de novo (no máximo uma vez a cada
+REFETCH_INTERVAL segundos) antes de recusar o token.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from google.auth import transport
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+REFETCH_INTERVAL = 60.0  # Tokens com chave desconhecida não forçam buscas seguidas
+
+
+def cache_max_age(headers) -> int:
+    """Segundos que a resposta pode ser reutilizada segundo Cache-Control/Age (0 = não guardar)."""
+    directives = {}
+    for part in (headers.get("cache-control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    try:
+        max_age = int(directives.get("max-age", 0))
+        age = int(headers.get("age") or 0)
+    except ValueError:
+        return 0
+    return max(0, max_age - age)
+
+
+class CachingRequest(transport.Request):
+    """Transporte do google-auth com sessão reutilizável e cache de GET por Cache-Control."""
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self._request = google_requests.Request(session=session or requests.Session())
+        self._cache: Dict[str, Tuple[float, transport.Response]] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.last_fetch = float("-inf")  # time.monotonic() da última busca
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET" or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+        # Sob o lock: logins simultâneos com o cache vencido fazem uma única busca
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            response = self._request(url, method=method, headers=headers, timeout=timeout, **kwargs)
+            self.fetches += 1
+            self.last_fetch = time.monotonic()
+            max_age = cache_max_age(response.headers) if response.status == 200 else 0
+            if max_age:
+                self._cache[url] = (time.monotonic() + max_age, response)
+            else:
+                self._cache.pop(url, None)
+            return response
+
+    def invalidate(self, url: str):
+        with self._lock:
+            self._cache.pop(url, None)
+
+
+def verify_oauth2_token(token: str, request: CachingRequest, audience: Optional[str], certs_url: str) -> dict:
+    """Como id_token.verify_oauth2_token, com os certificados de ``certs_url`` (em cache)."""
+    try:
+        idinfo = id_token.verify_token(token, request, audience=audience, certs_url=certs_url)
+    except ValueError as e:
+        # Só uma chave desconhecida justifica buscar de novo: os certificados em
+        # cache podem ser anteriores a uma rotação de chaves
+        if "key id" not in str(e) or time.monotonic() - request.last_fetch < REFETCH_INTERVAL:
+            raise
+        logger.info("Token não verificou com os certificados em cache; buscando de novo.")
+        request.invalidate(certs_url)
+        idinfo = id_token.verify_token(token, request, audience=audience, certs_url=certs_url)
+    if idinfo.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Emissor inválido: {idinfo.get('iss')}")
+    return idinfo
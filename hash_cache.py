@@ -0,0 +1,114 @@
+"""
+Hash dos arquivos locais (modo BASE_PATH) com cache persistente
+
+O hash serve para detectar mudanças: é calculado sobre o início do arquivo
+(HASH_BYTES) com BLAKE2b. Arquivos grandes são lidos via mmap (sem copiar
+para um buffer); nos pequenos, um read do tamanho exato é mais barato. O
+resultado fica em cache por caminho relativo junto com tamanho e mtime_ns; um
+arquivo só é lido de novo quando um dos dois muda.
+
+O cache é salvo em JSON (escrita atômica) ao fim de cada scan, só com os
+arquivos vistos nesse scan. A assinatura (algoritmo + bytes lidos) descarta o
+cache salvo se o cálculo mudar.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_BYTES = 1024 * 1024
+MMAP_MIN_BYTES = 64 * 1024  # Abaixo disso mmap/munmap custa mais que copiar
+SIGNATURE = f"blake2b-16:{HASH_BYTES}"
+
+
+def file_digest(path, size: Optional[int] = None) -> Optional[str]:
+    """BLAKE2b (16 bytes) dos primeiros HASH_BYTES do arquivo, ou None se não der para ler."""
+    try:
+        with open(path, 'rb') as f:
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+            length = min(size, HASH_BYTES)
+            if length < MMAP_MIN_BYTES:
+                return hashlib.blake2b(f.read(length), digest_size=16).hexdigest()
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mm:
+                return hashlib.blake2b(mm, digest_size=16).hexdigest()
+    except (OSError, ValueError):
+        return None
+
+
+class FileHashCache:
+    """Caminho relativo -> (tamanho, mtime_ns, hash). Seguro para as threads do scan."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, int, str]] = {}
+        self._seen: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def begin_scan(self):
+        """Zera as estatísticas e a lista de arquivos vistos (chamado no início de cada scan)."""
+        with self._lock:
+            self._seen = {}
+            self.hits = self.misses = 0
+
+    def get(self, key: str, path, stat: os.stat_result) -> Optional[str]:
+        """Hash do arquivo: do cache se tamanho e mtime_ns não mudaram, senão lê o arquivo."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            with self._lock:
+                self.hits += 1
+                self._seen[key] = entry
+            return entry[2]
+
+        digest = file_digest(path, stat.st_size)
+        with self._lock:
+            self.misses += 1
+            if digest is not None:
+                entry = self._entries[key] = (stat.st_size, stat.st_mtime_ns, digest)
+                self._seen[key] = entry
+        return digest
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def load(self, path: Path):
+        path = Path(path)
+        if not path.exists():
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de hashes: {e}")
+            return
+        if state.get("signature") != SIGNATURE:
+            logger.info("Cálculo do hash mudou; cache de hashes descartado.")
+            return
+        self._entries = {key: tuple(entry) for key, entry in state.get("files", {}).items()}
+
+    def save(self, path: Path):
+        """Salva só os arquivos vistos no último scan (escrita atômica)."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with self._lock:
+            self._entries = dict(self._seen)
+            state = {"signature": SIGNATURE, "files": {k: list(v) for k, v in self._entries.items()}}
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de hashes: {e}")
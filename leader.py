@@ -0,0 +1,92 @@
+"""
+Vários workers (uvicorn --workers N) compartilhando um único scanner
+
+Só o worker que obtém o lock exclusivo (fcntl.flock, não bloqueante) faz scans
+e escreve o snapshot. Os outros são seguidores: verificam o arquivo do
+snapshot (stat, barato) e, quando a versão no cabeçalho muda, recarregam o
+que o líder escreveu. Se o líder morre, o sistema operacional solta o lock e
+um seguidor assume na próxima verificação.
+
+/api/refresh num seguidor deixa um pedido em arquivo que o líder atende.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, cada processo é líder (use um único worker)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Lock de líder entre processos; mantido aberto enquanto o processo vive."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.request_path = self.path.with_name(self.path.name + ".refresh")
+        self.acquired = False
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        """Tenta virar líder sem bloquear. Retorna se este processo é o líder."""
+        if self.acquired:
+            return True
+        if fcntl is None:
+            self.acquired = True
+            return True
+        if self._file is None:
+            self._file = open(self.path, "a+")
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(os.getpid()))
+        self._file.flush()
+        self.acquired = True
+        return True
+
+    def release(self):
+        if self._file is not None:
+            if fcntl is not None and self.acquired:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.acquired = False
+
+    def request_refresh(self):
+        """Seguidor: pede ao líder um scan (atendido na próxima verificação dele)."""
+        self.request_path.touch()
+
+    def take_refresh_request(self) -> bool:
+        """Líder: consome um pedido de scan deixado por um seguidor."""
+        try:
+            self.request_path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+
+class SnapshotWatcher:
+    """Detecta troca do arquivo do snapshot (os.replace muda inode/mtime) só com stat."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._seen: Optional[tuple] = None
+
+    def changed(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        current = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if current == self._seen:
+            return False
+        self._seen = current
+        return True
@@ -1,6 +1,9 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends, Request
+import time
+PROCESS_START = time.perf_counter()  # Referência para o tempo até a primeira resposta
+
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from pathlib import Path
 import json
 import os
@@ -9,7 +12,15 @@ from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 from drive_scanner import DriveScanner
-from auth import auth_manager, get_current_user
+from snapshot import SnapshotStore
+from snapshot_format import SnapshotWriter, load_data, read_header
+from file_query import FileQueryIndex, QueryError, DEFAULT_LIMIT
+from search_index import SearchIndex, DEFAULT_LIMIT as SEARCH_LIMIT
+from scan_coordinator import ScanCoordinator
+from events import EventBroadcaster, count_changes, MAX_EVENT_CHANGES
+from leader import LeaderLock, SnapshotWatcher
+from static_files import StaticFiles
+from auth import auth_manager, get_current_user, get_current_user_stream, STREAM_TICKET_SECONDS
 from pydantic import BaseModel
 
 # Carregar variáveis de ambiente
@@ -18,7 +29,13 @@ load_dotenv()
 # --- Configuração ---
 IS_PRODUCTION = os.getenv("RENDER", "false").lower() == "true"
 SCAN_INTERVAL = int(os.getenv("SCAN_INTERVAL", 900))  # 15 minutos
-JSON_PATH = Path("file_data.json")
+SNAPSHOT_PATH = Path("file_data.snapshot")
+JSON_PATH = Path("file_data.json")  # Formato antigo, lido só se ainda não houver snapshot
+# Meta de tempo entre o início do processo e a API aceitar requisições
+STARTUP_TARGET_SECONDS = float(os.getenv("STARTUP_TARGET_SECONDS", 2.0))
+# Com vários workers só o dono deste lock faz scans; os outros releem o snapshot
+SCAN_LOCK_PATH = Path(os.getenv("SCAN_LOCK_FILE", "scan.lock"))
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", 2.0))
 GOOGLE_CREDS_JSON = os.getenv("GOOGLE_CREDS_JSON")
 
 # --- Validação de Credenciais ---
@@ -33,34 +50,163 @@ except json.JSONDecodeError:
 # --- Scanner ---
 scanner = DriveScanner(credentials_info)
 scheduler = AsyncIOScheduler()
+snapshot_store = SnapshotStore()
+query_index = FileQueryIndex()
+search_index = SearchIndex()
+event_broadcaster = EventBroadcaster()
+leader_lock = LeaderLock(SCAN_LOCK_PATH)
+snapshot_watcher = SnapshotWatcher(SNAPSHOT_PATH)
+static_files = StaticFiles()
+startup_metrics = {
+    "ready_seconds": None,            # API aceitando requisições
+    "snapshot_loaded_seconds": None,  # Último resultado salvo publicado
+    "first_scan_seconds": None,       # Primeiro scan deste processo publicado (líder)
+    "first_fresh_data_seconds": None  # Primeiro resultado novo publicado: scan próprio ou do líder
+}
+
+def _since_start() -> float:
+    return round(time.perf_counter() - PROCESS_START, 3)
+
+def _mark_fresh_data():
+    if startup_metrics["first_fresh_data_seconds"] is None:
+        startup_metrics["first_fresh_data_seconds"] = _since_start()
+
+def publish_scan(data: dict, diff: dict = None, last_modified: float = None):
+    """Publica um resultado de scan para todos os leitores da API."""
+    snapshot_store.publish(data, last_modified=last_modified, diff=diff)
+    query_index.publish(data)
+    search_index.publish(data, diff)
+    broadcast_scan(diff)
+
+def broadcast_scan(diff: dict = None):
+    """Avisa os clientes conectados em /api/events sobre a versão publicada."""
+    version = snapshot_store.current.version
+    if version == event_broadcaster.version:
+        return  # Scan sem mudanças
+    event = {"version": version, "base_version": None, "full": True}
+    if diff is not None:
+        changes = snapshot_store.changes_since(diff["base_version"])
+        # Delta grande não vai no evento: o cliente busca /api/files/changes
+        if changes is not None and count_changes(changes["changes"]) <= MAX_EVENT_CHANGES:
+            event = {**changes, "base_version": diff["base_version"]}
+    event_broadcaster.publish(version, event)
+
+def publish_partial(data: dict):
+    """Resultado parcial de um scan completo longo, enquanto não há nenhum resultado completo."""
+    current = snapshot_store.current
+    if current.last_modified and not current.data.get("partial"):
+        return  # Melhor continuar servindo o último resultado completo
+    data["partial"] = True
+    snapshot_store.publish(data)
+    query_index.publish(data)
+
+def load_persisted_snapshot():
+    """Publica o último resultado salvo em disco, antes do primeiro scan do processo.
+
+    O índice de busca fica para a thread do coordenador (``do_drive_scan``):
+    montá-lo aqui atrasaria a subida da API em cerca de um segundo a cada 50k arquivos.
+    """
+    path = SNAPSHOT_PATH if SNAPSHOT_PATH.exists() else JSON_PATH
+    if snapshot_store.load_file(path):
+        data = snapshot_store.current.data
+        query_index.publish(data)
+        scanner.set_baseline(data)
+        broadcast_scan()
+    startup_metrics["snapshot_loaded_seconds"] = _since_start()
+
+def reload_shared_snapshot():
+    """Seguidor: publica o snapshot escrito pelo worker líder se a versão mudou."""
+    header = read_header(SNAPSHOT_PATH)
+    if header is None or header.get("scan_version") == snapshot_store.current.version:
+        return
+    data = load_data(SNAPSHOT_PATH)
+    # Diff contra o que este worker servia: mantém /api/files/changes e os eventos incrementais
+    base_version = snapshot_store.current.version
+    changes = scanner.compute_diff(data)
+    scanner.scan_version = max(scanner.scan_version, data.get("version", 0))
+    diff = None if changes is None else {"base_version": base_version, "version": data.get("version", 0),
+                                         "disciplines": changes}
+    publish_scan(data, diff=diff, last_modified=SNAPSHOT_PATH.stat().st_mtime)
+    _mark_fresh_data()
+    print(f"Snapshot do worker líder carregado (versão {data.get('version', 0)})")
 
 def do_drive_scan():
-    """Executa o scan do Google Drive e salva o resultado em JSON."""
+    """Executa o scan do Google Drive e salva o resultado no snapshot compacto."""
+    # Só reconstrói na primeira vez (snapshot carregado na subida); depois já está em dia
+    search_index.publish(snapshot_store.current.data)
+    if not leader_lock.acquired:
+        reload_shared_snapshot()
+        return
+    if not scanner.available:
+        # Sem conexão o scan sai vazio: não pode substituir o último resultado salvo
+        print("Google Drive indisponível; mantendo o último resultado salvo.")
+        return
+    # Em scans completos os arquivos vão para o snapshot à medida que são encontrados
+    writer = SnapshotWriter(SNAPSHOT_PATH)
     try:
-        data = scanner.run_once()
-        with open(JSON_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"Scan do Drive salvo com sucesso em {JSON_PATH}")
+        data = scanner.run_once(on_file=writer.add_file, on_partial=publish_partial)
+        writer.commit(data)
+        publish_scan(data, diff=scanner.last_diff)
+        if startup_metrics["first_scan_seconds"] is None:
+            startup_metrics["first_scan_seconds"] = _since_start()
+        _mark_fresh_data()
+        print(f"Scan do Drive salvo com sucesso em {SNAPSHOT_PATH}")
     except Exception as e:
+        writer.abort()
         print(f"Erro durante o scan do Drive: {e}")
+        raise
+
+# Todos os scans (inicial, agendados e /api/refresh) passam pelo coordenador
+scan_coordinator = ScanCoordinator(do_drive_scan, progress_fn=lambda: scanner.progress)
+
+def schedule_scan():
+    if leader_lock.acquired:
+        scan_coordinator.request_scan("scheduled")
+
+def check_shared_snapshot():
+    """Verificação rápida (só stat/flock) entre workers, a cada SNAPSHOT_POLL_SECONDS."""
+    if leader_lock.acquired:
+        if leader_lock.take_refresh_request():
+            scan_coordinator.request_scan("manual (outro worker)")
+    elif leader_lock.try_acquire():
+        print("Worker líder saiu; este worker assumiu os scans.")
+        scan_coordinator.request_scan("leader takeover")
+    elif snapshot_watcher.changed():
+        scan_coordinator.request_scan("snapshot")  # Recarrega fora do event loop
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação."""
     print("Iniciando servidor HDAM Control...")
+    static_files.load()
+    event_broadcaster.bind(asyncio.get_running_loop())
+    if leader_lock.try_acquire():
+        print("Este worker é o líder: faz os scans do Drive.")
+    else:
+        print("Outro worker faz os scans; este serve o snapshot compartilhado.")
     
-    # Executa o primeiro scan imediatamente
-    do_drive_scan()
+    # Não espera o scan: a API sobe servindo o último resultado salvo e o
+    # primeiro scan roda em segundo plano. O snapshot é publicado antes de
+    # pedir o scan, para que ele nunca sobrescreva um resultado mais novo.
+    load_persisted_snapshot()
+    scan_coordinator.request_scan("startup")
     
-    # Agenda scans recorrentes
-    scheduler.add_job(do_drive_scan, 'interval', seconds=SCAN_INTERVAL)
+    # Agenda scans recorrentes (só no líder) e a verificação entre workers
+    scheduler.add_job(schedule_scan, 'interval', seconds=SCAN_INTERVAL)
+    scheduler.add_job(check_shared_snapshot, 'interval', seconds=SNAPSHOT_POLL_SECONDS)
     scheduler.start()
     
+    startup_metrics["ready_seconds"] = _since_start()
+    print(f"Servidor pronto em {startup_metrics['ready_seconds']:.3f}s (meta: {STARTUP_TARGET_SECONDS:.1f}s)")
+    
     yield
     
     # Desliga o scheduler ao finalizar
     print("Desligando scheduler...")
+    event_broadcaster.close()
     scheduler.shutdown()
+    scan_coordinator.shutdown()
+    leader_lock.release()
 
 # --- Aplicação FastAPI ---
 app = FastAPI(
@@ -139,7 +285,8 @@ async def add_authorized_email(
     current_user: dict = Depends(get_current_user)
 ):
     """Adiciona um email à lista de autorizados."""
-    auth_manager.add_authorized_email(request.email)
+    # Escrita em disco com fsync: fora do event loop
+    await asyncio.to_thread(auth_manager.add_authorized_email, request.email)
     return {"message": f"Email {request.email} adicionado com sucesso"}
 
 @app.delete("/api/admin/authorized-emails/{email}")
@@ -148,62 +295,135 @@ async def remove_authorized_email(
     current_user: dict = Depends(get_current_user)
 ):
     """Remove um email da lista de autorizados."""
-    auth_manager.remove_authorized_email(email)
+    await asyncio.to_thread(auth_manager.remove_authorized_email, email)
     return {"message": f"Email {email} removido com sucesso"}
 
 # --- Rotas da API (Protegidas) ---
 @app.get("/api/files")
-async def get_files(current_user: dict = Depends(get_current_user)):
-    """Retorna os dados dos arquivos cacheados do Drive."""
-    if not JSON_PATH.exists():
-        return {"error": "Cache de arquivos ainda não foi criado.", "disciplines": {}}
+async def get_files(request: Request, current_user: dict = Depends(get_current_user)):
+    """Retorna os dados dos arquivos cacheados do Drive (com ETag/Last-Modified)."""
+    return snapshot_store.current.to_response(request)
+
+@app.get("/api/files/changes")
+async def get_file_changes(
+    request: Request,
+    since: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """Retorna só as mudanças desde a versão ``since`` (ou o snapshot completo se ela for antiga demais)."""
+    changes = snapshot_store.changes_since(since)
+    if changes is None:
+        return snapshot_store.current.to_response(request)
+    return changes
+
+@app.get("/api/files/{discipline}")
+async def query_files(
+    discipline: str,
+    sort: str = "name",
+    order: str = "asc",
+    type: str = None,
+    folder: str = None,
+    date_from: str = None,
+    date_to: str = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Lista os arquivos de uma disciplina com paginação por cursor, ordenação e filtros."""
     try:
-        with open(JSON_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao ler cache: {e}")
+        result = query_index.query(
+            discipline, sort=sort, order=order, file_type=type, folder=folder,
+            date_from=date_from, date_to=date_to, limit=limit, cursor=cursor
+        )
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Disciplina não encontrada: {discipline}")
+    return result
 
-@app.post("/api/refresh")
-async def refresh_files(
-    background_tasks: BackgroundTasks,
+@app.get("/api/search")
+async def search_files(
+    q: str,
+    discipline: str = None,
+    limit: int = SEARCH_LIMIT,
     current_user: dict = Depends(get_current_user)
 ):
-    """Dispara uma nova varredura do Google Drive em segundo plano."""
-    background_tasks.add_task(do_drive_scan)
-    return {"status": "success", "message": "Atualização iniciada em segundo plano."}
+    """Busca arquivos por nome, pasta e notas (aceita trechos de código como "EST-0")."""
+    return search_index.search(q, discipline=discipline, limit=limit)
+
+@app.post("/api/events/ticket")
+async def file_events_ticket(current_user: dict = Depends(get_current_user)):
+    """Ticket de uso único para abrir /api/events (o EventSource do navegador não envia headers)."""
+    return {"ticket": auth_manager.create_stream_ticket(current_user), "expires_in": STREAM_TICKET_SECONDS}
+
+@app.get("/api/events")
+async def file_events(request: Request, current_user: dict = Depends(get_current_user_stream)):
+    """Eventos (SSE) a cada nova versão dos arquivos, com o delta quando ele é pequeno.
+    
+    O navegador abre ``/api/events?ticket=...`` com um ticket de
+    ``POST /api/events/ticket``; o token de acesso não vai na URL.
+    """
+    try:
+        last_event_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_event_id = None
+    return StreamingResponse(
+        event_broadcaster.stream(last_event_id, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/refresh")
+async def refresh_files(current_user: dict = Depends(get_current_user)):
+    """Dispara uma nova varredura do Google Drive em segundo plano.
+    
+    Se já houver um scan em andamento, o pedido é agrupado numa única
+    execução logo depois dele.
+    """
+    if not leader_lock.acquired:
+        leader_lock.request_refresh()
+        return {"status": "success", "message": "Atualização pedida ao worker que faz os scans.",
+                "scan": scan_coordinator.status()}
+    was_running = scan_coordinator.running
+    scan_coordinator.request_scan("manual")
+    message = ("Scan em andamento; atualização agendada para logo em seguida." if was_running
+               else "Atualização iniciada em segundo plano.")
+    return {"status": "success", "message": message, "scan": scan_coordinator.status()}
 
 @app.get("/api/status")
 async def get_status(current_user: dict = Depends(get_current_user)):
     """Retorna o status do sistema."""
+    # Seguidores não fazem scan: ficam "fresh" ao publicar o primeiro snapshot novo do líder
+    warming_up = startup_metrics["first_fresh_data_seconds"] is None
+    if not warming_up:
+        data_state = "fresh"
+    elif snapshot_store.current.data.get("partial"):
+        data_state = "partial"  # Primeiro scan em andamento, sem resultado salvo
+    elif snapshot_store.current.last_modified:
+        data_state = "stale"    # Último resultado salvo, primeiro scan em andamento
+    else:
+        data_state = "empty"
+    
     return {
         "status": "online",
+        "warming_up": warming_up,
+        "data_state": data_state,
+        "startup": {**startup_metrics, "target_seconds": STARTUP_TARGET_SECONDS},
         "service": "Google Drive Mode",
+        "role": "leader" if leader_lock.acquired else "follower",
         "scan_interval_seconds": SCAN_INTERVAL,
-        "last_scan_timestamp": JSON_PATH.stat().st_mtime if JSON_PATH.exists() else None
+        "last_scan_timestamp": snapshot_store.current.last_modified or None,
+        "data_version": snapshot_store.current.version,
+        "event_clients": event_broadcaster.clients,
+        "scan": scan_coordinator.status()
     }
 
 # --- Servir Arquivos Estáticos ---
 # Arquivos estáticos são públicos - a proteção é feita pelo JavaScript
 @app.get("/{full_path:path}")
-async def serve_static(full_path: str):
-    """Serve arquivos estáticos sem autenticação."""
-    path = Path(full_path).as_posix() or "index.html"
-    
-    # Mapear rotas especiais
-    if path in ["login", "login.html", "login/"]:
-        path = "login.html"
-    elif path == "" or path == "/":
-        path = "index.html"
-    
-    static_file = Path(__file__).parent / path
-    
-    # Se o arquivo existe, serve ele
-    if static_file.exists() and static_file.is_file():
-        return FileResponse(static_file)
-    
-    # Fallback para index.html (SPA)
-    index_path = Path(__file__).parent / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
-        
-    raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+async def serve_static(full_path: str, request: Request):
+    """Serve arquivos estáticos sem autenticação (pré-carregados na inicialização)."""
+    asset = static_files.get(full_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return asset.to_response(request)
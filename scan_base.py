@@ -0,0 +1,80 @@
+"""
+Partes comuns dos scanners (DriveScanner e FileScanner)
+
+Notas dos arquivos (file_notes.json), tamanho formatado e montagem do
+resultado por disciplina, no formato que a API e o snapshot esperam::
+
+    {"last_scan": ..., "disciplines": {disc_key: {"name", "path", "files",
+     "folders", "total_files", "total_size", "total_size_bytes"}}}
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from snapshot_format import format_size
+
+logger = logging.getLogger(__name__)
+
+
+class ScannerBase(ABC):
+    """Base dos scanners: ``config`` com ``notes_file`` e ``disciplines``."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.notes = self.load_notes()
+
+    def load_notes(self):
+        """Carrega notas salvas anteriormente"""
+        notes_path = Path(self.config["notes_file"])
+        if notes_path.exists():
+            try:
+                with open(notes_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Erro ao carregar notas: {e}")
+        return {}
+
+    def save_notes(self):
+        """Salva notas no arquivo"""
+        try:
+            with open(self.config["notes_file"], 'w', encoding='utf-8') as f:
+                json.dump(self.notes, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"Erro ao salvar notas: {e}")
+
+    @staticmethod
+    def format_size(size_bytes) -> str:
+        """Formata tamanho em bytes para formato legível"""
+        return format_size(size_bytes)
+
+    @abstractmethod
+    def discipline_path(self, disc_key: str) -> str:
+        """Valor do campo ``path`` da disciplina no resultado."""
+
+    def _discipline_result(self, disc_key: str, files: List[dict], folders: Iterable[str]) -> dict:
+        total_size = sum(f['size_bytes'] for f in files)
+        return {
+            "name": self.config["disciplines"][disc_key]["name"],
+            "path": self.discipline_path(disc_key),
+            "files": files,
+            "folders": folders,
+            "total_files": len(files),
+            "total_size": self.format_size(total_size),
+            "total_size_bytes": total_size
+        }
+
+    def _assemble_result(self, files_by_disc: Dict[str, List], folders_by_disc: Dict[str, List], log: bool = True) -> dict:
+        result = {
+            "last_scan": datetime.now().isoformat(),
+            "disciplines": {}
+        }
+        for disc_key in self.config["disciplines"]:
+            disc = result["disciplines"][disc_key] = self._discipline_result(
+                disc_key, files_by_disc[disc_key], folders_by_disc[disc_key])
+            if log:
+                logger.info(f"{disc['name']}: {disc['total_files']} arquivos ({disc['total_size']})")
+        return result
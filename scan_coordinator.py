@@ -0,0 +1,112 @@
+"""
+Coordenação dos scans: um scan por vez, fora do event loop
+
+Scans rodam numa thread dedicada. Pedidos que chegam durante um scan (agendador,
+/api/refresh) não disparam scans paralelos: são agrupados em uma única
+execução logo depois da atual.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ScanCoordinator:
+    """Executa ``scan_fn`` com no máximo um scan em andamento e no máximo um na fila."""
+
+    def __init__(self, scan_fn: Callable[[], None], progress_fn: Optional[Callable[[], dict]] = None):
+        self._scan_fn = scan_fn
+        self._progress_fn = progress_fn or dict
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-coordinator")
+        self._lock = threading.Lock()
+        self._current: Optional[Future] = None   # Scan em andamento
+        self._queued: Optional[Future] = None    # Scan seguinte (pedidos agrupados)
+        self._queued_reasons = []
+        self._current_run = None
+        self.last_run = None
+        self.runs = 0
+        self.coalesced = 0
+
+    @property
+    def running(self) -> bool:
+        return self._current is not None
+
+    def request_scan(self, reason: str = "manual") -> Future:
+        """Pede um scan. Retorna um Future resolvido quando um scan iniciado após o pedido terminar."""
+        with self._lock:
+            if self._current is None:
+                self._current = Future()
+                self._current_run = {"reason": reason, "started_at": time.time()}
+                self._executor.submit(self._run_loop)
+                return self._current
+
+            if self._queued is None:
+                self._queued = Future()
+            else:
+                self.coalesced += 1
+            self._queued_reasons.append(reason)
+            return self._queued
+
+    def _run_loop(self):
+        while True:
+            run = self._current_run
+            logger.info(f"Scan iniciado (motivo: {run['reason']})")
+            error = None
+            try:
+                self._scan_fn()
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Erro durante o scan: {e}")
+            finished_at = time.time()
+
+            with self._lock:
+                self.runs += 1
+                self.last_run = {
+                    **run,
+                    "finished_at": finished_at,
+                    "duration_seconds": round(finished_at - run["started_at"], 3),
+                    "error": error
+                }
+                done = self._current
+                if self._queued is not None:
+                    # Os pedidos que chegaram durante o scan viram uma única execução
+                    self._current, self._queued = self._queued, None
+                    self._current_run = {"reason": ", ".join(dict.fromkeys(self._queued_reasons)),
+                                         "started_at": time.time()}
+                    self._queued_reasons = []
+                    more = True
+                else:
+                    self._current = None
+                    self._current_run = None
+                    more = False
+            done.set_result(self.last_run)
+
+            if not more:
+                return
+
+    def status(self) -> dict:
+        """Estado para /api/status: scan em andamento, fila e última execução."""
+        with self._lock:
+            current = None
+            if self._current_run is not None:
+                current = {
+                    **self._current_run,
+                    "elapsed_seconds": round(time.time() - self._current_run["started_at"], 3),
+                    "progress": dict(self._progress_fn())
+                }
+            return {
+                "state": "running" if current else "idle",
+                "current": current,
+                "queued": self._queued is not None,
+                "queued_reasons": list(dict.fromkeys(self._queued_reasons)),
+                "coalesced_requests": self.coalesced,
+                "runs": self.runs,
+                "last_run": self.last_run
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
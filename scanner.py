@@ -1,170 +1,198 @@
 #!/usr/bin/env python3
 """
 HDAM File Scanner - Módulo reutilizável
+
+Além do scan completo (``run_once``), o modo watch (``watch``) recebe os
+eventos do sistema de arquivos (inotify no Linux, via watchfiles) das pastas
+das disciplinas, agrupados em lotes, e atualiza só os arquivos afetados. Um
+scan completo periódico continua valendo como verificação de consistência.
 """
 
 import os
-import json
 import time
-import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
 import logging
 
+from hash_cache import FileHashCache, file_digest
+from scan_base import ScannerBase
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-class FileScanner:
+try:
+    import watchfiles
+except ImportError:  # watchfiles é opcional - sem ele só há o scan completo
+    watchfiles = None
+
+RELEVANT_EXTENSIONS = ('.dwg', '.pdf')
+
+class FileScanner(ScannerBase):
+    """Modo BASE_PATH: uma pasta por disciplina, com hash dos arquivos e modo watch.
+
+    Monta o resultado com ``ScannerBase._assemble_result``, mas lista as
+    pastas por conta própria em vez de usar o ``LocalBackend``: o cache de
+    hashes precisa do ``os.stat_result`` (``st_mtime_ns``) e do caminho
+    absoluto, que os itens no formato do Drive não trazem, e o modo watch
+    atualiza por caminho, sem a API de mudanças que o pipeline do
+    DriveScanner usa no scan incremental.
+    """
+
     def __init__(self, base_path: Path, config=None):
         self.base_path = Path(base_path)
-        self.config = config or {
+        super().__init__(config or {
             "output_file": "file_data.json",
             "notes_file": "file_notes.json",
+            "hash_cache_file": "file_hashes.json",
+            "max_workers": 8,  # Pastas listadas em paralelo
+            "watch_debounce_ms": 2000,  # Modo watch: eventos agrupados em lotes
+            "rescan_interval": 3600,    # Modo watch: scan completo de verificação
             "disciplines": {
                 "architecture": {"name": "ARQUITETURA", "path": "ARQUITETURA"},
                 "structure": {"name": "ESTRUTURA", "path": "ESTRUTURA"},
                 "hydraulic": {"name": "HIDRÁULICA", "path": "HIDRAULICA"},
                 "metallic": {"name": "METÁLICA", "path": "METALICA"}
             }
-        }
-        self.notes = self.load_notes()
+        })
+        self.max_workers = max(1, int(self.config.get("max_workers", 8)))
+        # Hash só é recalculado para arquivos com tamanho/mtime diferentes do último scan
+        self.hash_cache = FileHashCache()
+        self.hash_cache.load(self.config.get("hash_cache_file", "file_hashes.json"))
+        # Índice do último resultado, atualizado pelo modo watch
+        self.data = None
+        self._index: Dict[str, Dict[str, dict]] = {}  # disciplina -> full_path -> registro
+        self._folders: Dict[str, set] = {}
         
-    def load_notes(self):
-        """Carrega notas salvas anteriormente"""
-        notes_path = Path(self.config["notes_file"])
-        if notes_path.exists():
-            try:
-                with open(notes_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Erro ao carregar notas: {e}")
-        return {}
-    
-    def save_notes(self):
-        """Salva notas no arquivo"""
-        try:
-            with open(self.config["notes_file"], 'w', encoding='utf-8') as f:
-                json.dump(self.notes, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"Erro ao salvar notas: {e}")
-    
     def get_file_hash(self, filepath):
-        """Gera hash MD5 do arquivo para detectar mudanças"""
-        try:
-            with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read(1024 * 1024)).hexdigest()
-        except:
-            return None
+        """Gera hash (BLAKE2b do primeiro 1MB) do arquivo para detectar mudanças"""
+        return file_digest(filepath)
     
-    def format_size(self, size_bytes):
-        """Formata tamanho em bytes para formato legível"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f}{unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f}TB"
+    def _file_hash(self, key, path, stat):
+        return self.hash_cache.get(key, path, stat)
     
-    def scan_directory(self, directory_path, relative_to=None):
-        """Escaneia um diretório e retorna estrutura de arquivos"""
+    def _file_info(self, name, path, ext, stat, rel_root, sub_parts):
+        """Registro de um arquivo; ``rel_root`` é a pasta da disciplina e ``sub_parts`` as subpastas até o arquivo."""
+        full_path = "/".join(rel_root + sub_parts + (name,))
+        file_info = {
+            "name": name,
+            "type": ext[1:],  # Remove o ponto
+            "size": self.format_size(stat.st_size),
+            "size_bytes": stat.st_size,
+            "modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d"),
+            "modified_timestamp": stat.st_mtime,
+            "path": "/".join(sub_parts),
+            "full_path": full_path,
+            "hash": self._file_hash(full_path, path, stat)
+        }
+        
+        # Adicionar nota se existir
+        note_key = f"{rel_root[0]}_{name}" if rel_root else name
+        if note_key in self.notes:
+            file_info["notes"] = self.notes[note_key]
+        return file_info
+    
+    def _list_directory(self, directory, rel_root, sub_parts):
+        """Lista uma pasta com os.scandir. Retorna (arquivos relevantes, [(subpasta, sub_parts)], tamanho).
+        
+        O tipo de cada entrada vem da própria listagem; só os arquivos DWG/PDF
+        pedem stat (e o DirEntry guarda o resultado - no Windows ele já vem da listagem).
+        """
         files = []
-        folders = []
+        subdirs = []
         total_size = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    # Links para pastas não são seguidos (evita ciclos)
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.path, sub_parts + (entry.name,)))
+                        continue
+                    # Filtrar apenas arquivos DWG e PDF
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if ext not in RELEVANT_EXTENSIONS or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    files.append(self._file_info(entry.name, entry.path, ext, stat, rel_root, sub_parts))
+                    total_size += stat.st_size
+                except OSError as e:
+                    logger.error(f"Erro ao processar {entry.path}: {e}")
+        return files, subdirs, total_size
+    
+    def scan_directory(self, directory_path, relative_to=None):
+        """Escaneia um diretório (sem descer nas subpastas) e retorna estrutura de arquivos"""
+        dir_path = Path(directory_path)
+        if not dir_path.exists():
+            logger.warning(f"Diretório não encontrado: {directory_path}")
+            return [], [], 0
         
+        # A primeira parte do caminho relativo é a pasta da disciplina
+        parts = (dir_path.relative_to(relative_to) if relative_to else dir_path).parts
         try:
-            dir_path = Path(directory_path)
-            if not dir_path.exists():
-                logger.warning(f"Diretório não encontrado: {directory_path}")
-                return files, folders, total_size
-            
-            for item in dir_path.iterdir():
-                try:
-                    if item.is_dir():
-                        folders.append(item.name)
-                    elif item.is_file():
-                        # Filtrar apenas arquivos DWG e PDF
-                        ext = item.suffix.lower()
-                        if ext in ['.dwg', '.pdf']:
-                            stat = item.stat()
-                            relative_path = item.relative_to(relative_to) if relative_to else item
-                            
-                            # Determinar pasta relativa
-                            path_parts = list(relative_path.parts[:-1])
-                            folder_path = path_parts[1] if len(path_parts) > 1 else ""
-                            
-                            file_info = {
-                                "name": item.name,
-                                "type": ext[1:],  # Remove o ponto
-                                "size": self.format_size(stat.st_size),
-                                "size_bytes": stat.st_size,
-                                "modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d"),
-                                "modified_timestamp": stat.st_mtime,
-                                "path": folder_path,
-                                "full_path": str(relative_path).replace('\\', '/'),
-                                "hash": self.get_file_hash(item)
-                            }
-                            
-                            # Adicionar nota se existir
-                            note_key = f"{relative_path.parts[0]}_{item.name}"
-                            if note_key in self.notes:
-                                file_info["notes"] = self.notes[note_key]
-                            
-                            files.append(file_info)
-                            total_size += stat.st_size
-                            
-                except Exception as e:
-                    logger.error(f"Erro ao processar {item}: {e}")
-                    
-        except Exception as e:
+            files, subdirs, total_size = self._list_directory(dir_path, parts[:1], parts[1:])
+        except OSError as e:
             logger.error(f"Erro ao escanear diretório {directory_path}: {e}")
-            
-        return files, folders, total_size
+            return [], [], 0
+        return files, [sub_parts[-1] for _, sub_parts in subdirs], total_size
     
     def scan_all_disciplines(self):
-        """Escaneia todas as disciplinas"""
-        result = {
-            "last_scan": datetime.now().isoformat(),
-            "disciplines": {}
-        }
+        """Escaneia todas as disciplinas, com todas as subpastas.
         
-        for disc_key, disc_info in self.config["disciplines"].items():
-            logger.info(f"Escaneando {disc_info['name']}...")
-            
-            disc_path = self.base_path / disc_info["path"]
-            files = []
-            folders = []
-            total_size = 0
-            
-            if disc_path.exists():
-                # Escanear arquivos na raiz da disciplina
-                root_files, _, root_size = self.scan_directory(disc_path, self.base_path)
-                files.extend(root_files)
-                total_size += root_size
-                
-                # Escanear subpastas
-                for subdir in disc_path.iterdir():
-                    if subdir.is_dir():
-                        folders.append(subdir.name)
-                        sub_files, _, sub_size = self.scan_directory(subdir, self.base_path)
-                        files.extend(sub_files)
-                        total_size += sub_size
-            
-            result["disciplines"][disc_key] = {
-                "name": disc_info["name"],
-                "path": disc_info["path"],
-                "files": files,
-                "folders": folders,
-                "total_files": len(files),
-                "total_size": self.format_size(total_size),
-                "total_size_bytes": total_size
-            }
+        As pastas de todas as disciplinas são listadas em paralelo (até
+        ``max_workers`` ao mesmo tempo): cada subpasta entra na fila do pool
+        assim que a listagem da pasta pai termina.
+        """
+        found = {disc_key: {"files": [], "folders": [], "total_size": 0}
+                 for disc_key in self.config["disciplines"]}
+        self.hash_cache.begin_scan()
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="file-scan") as executor:
+            pending = {}
+            for disc_key, disc_info in self.config["disciplines"].items():
+                disc_path = self.base_path / disc_info["path"]
+                if disc_path.is_dir():
+                    logger.info(f"Escaneando {disc_info['name']}...")
+                    rel_root = Path(disc_info["path"]).parts
+                    pending[executor.submit(self._list_directory, disc_path, rel_root, ())] = (disc_key, disc_path, rel_root)
             
-            logger.info(f"  → {len(files)} arquivos encontrados ({self.format_size(total_size)})")
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    disc_key, directory, rel_root = pending.pop(future)
+                    try:
+                        files, subdirs, size = future.result()
+                    except OSError as e:
+                        logger.error(f"Erro ao escanear diretório {directory}: {e}")
+                        continue
+                    
+                    bucket = found[disc_key]
+                    bucket["files"].extend(files)
+                    bucket["total_size"] += size
+                    for subdir, sub_parts in subdirs:
+                        if len(sub_parts) == 1:
+                            bucket["folders"].append(sub_parts[0])
+                        pending[executor.submit(self._list_directory, subdir, rel_root, sub_parts)] = (disc_key, subdir, rel_root)
+        
+        result = self._assemble_result({k: bucket["files"] for k, bucket in found.items()},
+                                       {k: bucket["folders"] for k, bucket in found.items()})
         
+        cache = self.hash_cache
+        logger.info(f"Hashes: {cache.hits} do cache, {cache.misses} calculados "
+                    f"(acerto {cache.hit_rate:.0%})")
         return result
     
+    def discipline_path(self, disc_key):
+        return self.config["disciplines"][disc_key]["path"]
+    
+    def _discipline_result(self, disc_key, files, folders):
+        # As pastas terminam em qualquer ordem: ordena para o resultado não variar entre scans
+        return super()._discipline_result(disc_key, sorted(files, key=lambda f: (f["path"], f["name"])),
+                                          sorted(folders))
+    
     def run_once(self):
         """Executa um scan único e retorna os dados"""
         logger.info("Iniciando scan...")
@@ -172,8 +200,132 @@ class FileScanner:
         
         data = self.scan_all_disciplines()
         self.save_notes()
+        self.hash_cache.save(self.config.get("hash_cache_file", "file_hashes.json"))
+        
+        self.data = data
+        self._index = {disc_key: {f["full_path"]: f for f in disc["files"]}
+                       for disc_key, disc in data["disciplines"].items()}
+        self._folders = {disc_key: set(disc["folders"]) for disc_key, disc in data["disciplines"].items()}
         
         elapsed = time.time() - start_time
         logger.info(f"Scan completo em {elapsed:.2f}s")
         
-        return data
\ No newline at end of file
+        return data
+    
+    def _locate(self, path):
+        """(disciplina, pasta da disciplina, subpastas, relativo) de um caminho absoluto, ou None se fora delas."""
+        try:
+            rel = Path(path).relative_to(self.base_path).parts
+        except ValueError:
+            return None
+        for disc_key, disc_info in self.config["disciplines"].items():
+            rel_root = Path(disc_info["path"]).parts
+            if rel[:len(rel_root)] == rel_root:
+                return disc_key, rel_root, rel[len(rel_root):], "/".join(rel)
+        return None
+    
+    def _walk(self, directory, rel_root, sub_parts):
+        """Arquivos relevantes de uma pasta e subpastas (sequencial: usado para pastas novas/movidas)."""
+        files = []
+        stack = [(directory, sub_parts)]
+        while stack:
+            current, parts = stack.pop()
+            try:
+                found, subdirs, _ = self._list_directory(current, rel_root, parts)
+            except OSError as e:
+                logger.error(f"Erro ao escanear diretório {current}: {e}")
+                continue
+            files.extend(found)
+            stack.extend(subdirs)
+        return files
+    
+    def apply_changes(self, paths: Iterable[str]) -> dict:
+        """Atualiza o último resultado com os caminhos alterados (arquivos ou pastas).
+        
+        Cada caminho é conferido no disco, então a ordem dos eventos de um
+        lote não importa: pasta existente é relida, arquivo relevante é
+        atualizado e caminho que não existe mais sai do índice (com tudo o que
+        estava abaixo dele, se era uma pasta).
+        """
+        if self.data is None:
+            return self.run_once()
+        
+        changed = set()
+        removed_prefixes = {}  # disciplina -> caminhos removidos que podem ter sido pastas
+        for path in paths:
+            located = self._locate(path)
+            if located is None:
+                continue
+            disc_key, rel_root, sub_parts, rel_path = located
+            index, folders = self._index[disc_key], self._folders[disc_key]
+            
+            if os.path.isdir(path):
+                # Pasta nova ou movida para cá: substitui o que havia abaixo dela
+                removed_prefixes.setdefault(disc_key, set()).add(rel_path)
+                for info in self._walk(path, rel_root, sub_parts):
+                    index[info["full_path"]] = info
+                if len(sub_parts) == 1:
+                    folders.add(sub_parts[0])
+            elif os.path.isfile(path) and os.path.splitext(path)[1].lower() in RELEVANT_EXTENSIONS:
+                try:
+                    info = self._file_info(sub_parts[-1], path, os.path.splitext(path)[1].lower(),
+                                           os.stat(path), rel_root, sub_parts[:-1])
+                except OSError as e:
+                    logger.error(f"Erro ao processar {path}: {e}")
+                    continue
+                index[info["full_path"]] = info
+            elif index.pop(rel_path, None) is None:
+                removed_prefixes.setdefault(disc_key, set()).add(rel_path)
+                if len(sub_parts) == 1:
+                    folders.discard(sub_parts[0])
+            changed.add(disc_key)
+        
+        for disc_key, prefixes in removed_prefixes.items():
+            prefixes = tuple(prefix + "/" for prefix in prefixes)
+            index = self._index[disc_key]
+            for key in [key for key, info in index.items()
+                        if key.startswith(prefixes) and not os.path.exists(self.base_path / key)]:
+                del index[key]
+        
+        if changed:
+            disciplines = dict(self.data["disciplines"])
+            for disc_key in changed:
+                disciplines[disc_key] = self._discipline_result(
+                    disc_key, self._index[disc_key].values(), self._folders[disc_key])
+            self.data = {"last_scan": datetime.now().isoformat(), "disciplines": disciplines}
+            logger.info(f"Atualização incremental: {', '.join(sorted(changed))}")
+        return self.data
+    
+    def _watch_filter(self, change, path):
+        # Arquivos de outros tipos (temporários da sincronização etc.) não interessam;
+        # remoções passam sempre, pois o caminho removido pode ter sido uma pasta
+        return (change == watchfiles.Change.deleted
+                or os.path.splitext(path)[1].lower() in RELEVANT_EXTENSIONS
+                or (change == watchfiles.Change.added and os.path.isdir(path)))
+    
+    def watch(self, on_update: Callable[[dict], None], stop_event: Optional[object] = None):
+        """Modo watch: scan completo e depois atualizações incrementais por lote de eventos.
+        
+        ``on_update`` recebe o resultado completo a cada mudança. Com
+        ``stop_event`` (threading.Event) o laço pode ser encerrado de fora.
+        """
+        if watchfiles is None:
+            raise RuntimeError("Modo watch requer o pacote watchfiles (pip install watchfiles)")
+        rescan_interval = float(self.config.get("rescan_interval", 3600))
+        debounce = int(self.config.get("watch_debounce_ms", 2000))
+        
+        on_update(self.run_once())
+        last_full_scan = time.monotonic()
+        roots = [self.base_path / d["path"] for d in self.config["disciplines"].values()
+                 if (self.base_path / d["path"]).is_dir()] or [self.base_path]
+        logger.info(f"Observando {len(roots)} pasta(s); scan completo a cada {rescan_interval:.0f}s")
+        
+        # rust_timeout acorda o laço mesmo sem eventos, para o scan periódico
+        for changes in watchfiles.watch(*roots, watch_filter=self._watch_filter, debounce=debounce,
+                                        rust_timeout=int(min(rescan_interval, 60) * 1000),
+                                        yield_on_timeout=True, stop_event=stop_event, raise_interrupt=False):
+            if time.monotonic() - last_full_scan >= rescan_interval:
+                on_update(self.run_once())
+                last_full_scan = time.monotonic()
+            elif changes:
+                on_update(self.apply_changes({path for _, path in changes}))
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Índice de busca dos arquivos (/api/search)
+
+Indexa nome, pasta e notas de cada arquivo. O texto é normalizado (sem acento,
+minúsculo) e quebrado em tokens alfanuméricos; cada termo da busca casa com
+tokens que começam com ele (vocabulário ordenado + busca binária) ou, a partir
+de 3 caracteres, que o contêm (índice de trigramas sobre o vocabulário). Assim
+"EST-0" encontra "EST-00012-R01.pdf" e "0012" também.
+
+O índice é atualizado incrementalmente com o diff de cada scan.
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos: 'Hidráulica' -> 'hidraulica'."""
+    if text.isascii():
+        return text.lower()  # Caso comum (nomes de arquivo): nada a decompor
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """Índice invertido token -> ids de arquivo, com prefixo e trigramas sobre o vocabulário."""
+
+    def __init__(self):
+        self.version = 0
+        self.docs: Dict[str, tuple] = {}            # id -> (disciplina, info, tokens, tokens do nome)
+        self.postings: Dict[str, Set[str]] = {}     # token -> ids (nome, pasta e notas)
+        self.name_postings: Dict[str, Set[str]] = {}  # token -> ids (só nome, para relevância)
+        self.token_trigrams: Dict[str, Set[str]] = {}  # trigrama -> tokens do vocabulário
+        self._vocabulary: Optional[List[str]] = []  # ordenado; None = precisa reordenar
+        self._name_order: Optional[Dict[str, int]] = {}  # id -> posição por nome; None = recalcular
+        self._lock = threading.RLock()
+        self._publish_lock = threading.Lock()  # Um publish por vez (o rebuild roda fora de _lock)
+
+    # --- Atualização ---
+    def publish(self, data: dict, diff: Optional[dict] = None):
+        """Aplica o diff do scan se ele parte da versão indexada; senão reconstrói tudo."""
+        with self._publish_lock:
+            with self._lock:
+                if diff is not None and diff["base_version"] == self.version:
+                    self.apply_diff(diff)
+                    return
+                if data.get("version", 0) == self.version and self.docs:
+                    return
+            self.rebuild(data)
+
+    def rebuild(self, data: dict):
+        """Monta um índice novo fora do lock e troca tudo de uma vez.
+
+        ``search`` roda no event loop: durante a montagem (cerca de 1s a cada
+        50k arquivos) as buscas continuam respondendo com o índice anterior.
+        """
+        fresh = SearchIndex()
+        for disc_key, disc in data.get("disciplines", {}).items():
+            for info in disc.get("files", []):
+                fresh._add(disc_key, info)
+        fresh._vocabulary = sorted(fresh.postings)
+        fresh._name_order = fresh._sorted_by_name()
+        with self._lock:
+            self.docs = fresh.docs
+            self.postings = fresh.postings
+            self.name_postings = fresh.name_postings
+            self.token_trigrams = fresh.token_trigrams
+            self._vocabulary = fresh._vocabulary
+            self._name_order = fresh._name_order
+            self.version = data.get("version", 0)
+
+    def apply_diff(self, diff: dict):
+        with self._lock:
+            for disc_key, changes in diff["disciplines"].items():
+                for file_id in changes["removed"]:
+                    doc = self.docs.get(file_id)
+                    # Trocar de disciplina gera remoção na antiga e adição na nova
+                    if doc is not None and doc[0] == disc_key:
+                        self._remove(file_id)
+                for info in changes["added"] + changes["modified"]:
+                    self._remove(info["id"])
+                    self._add(disc_key, info)
+            self.version = diff["version"]
+
+    def _add(self, disc_key: str, info: dict):
+        name_tokens = frozenset(tokenize(info["name"]))
+        tokens = name_tokens | frozenset(tokenize(f"{info.get('path', '')} {info.get('notes') or ''}"))
+        self.docs[info["id"]] = (disc_key, info, tokens, name_tokens)
+        self._name_order = None
+        for token in name_tokens:
+            self.name_postings.setdefault(token, set()).add(info["id"])
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                for trigram in trigrams(token):
+                    self.token_trigrams.setdefault(trigram, set()).add(token)
+                self._vocabulary = None
+            ids.add(info["id"])
+
+    def _remove(self, file_id: str):
+        doc = self.docs.pop(file_id, None)
+        if doc is None:
+            return
+        self._name_order = None
+        for token in doc[3]:
+            ids = self.name_postings[token]
+            ids.discard(file_id)
+            if not ids:
+                del self.name_postings[token]
+        for token in doc[2]:
+            ids = self.postings[token]
+            ids.discard(file_id)
+            if not ids:
+                del self.postings[token]
+                for trigram in trigrams(token):
+                    tokens = self.token_trigrams[trigram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.token_trigrams[trigram]
+                self._vocabulary = None
+
+    # --- Consulta ---
+    def _sorted_by_name(self) -> Dict[str, int]:
+        """id -> posição na ordem alfabética (normalizada) dos nomes."""
+        docs = self.docs
+        ordered = sorted(docs, key=lambda i: (normalize_text(docs[i][1]["name"]), i))
+        return {file_id: position for position, file_id in enumerate(ordered)}
+
+    def _matching_tokens(self, term: str) -> Set[str]:
+        """Tokens do vocabulário que começam com ``term`` ou (3+ caracteres) o contêm."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+
+        matched = set()
+        i = bisect_left(vocabulary, term)
+        while i < len(vocabulary) and vocabulary[i].startswith(term):
+            matched.add(vocabulary[i])
+            i += 1
+
+        if len(term) >= 3:
+            candidates = None
+            for trigram in sorted(trigrams(term), key=lambda t: len(self.token_trigrams.get(t, ()))):
+                tokens = self.token_trigrams.get(trigram)
+                if not tokens:
+                    return matched
+                candidates = set(tokens) if candidates is None else candidates & tokens
+            matched.update(token for token in candidates if term in token)
+        return matched
+
+    def _ids_matching_all(self, terms: List[str], field: int, matching: Dict[str, Set[str]]) -> Set[str]:
+        """Ids cujos tokens (``field`` do doc: 2 = todos, 3 = só nome) casam com todos os termos."""
+        postings = self.postings if field == 2 else self.name_postings
+        docs = self.docs
+        result = None
+        for term in terms:
+            tokens = matching[term]
+            if result is not None and len(tokens) > len(result):
+                # Termo curto ("0") casa com muitos tokens: mais barato filtrar o que já sobrou
+                result = {i for i in result if not docs[i][field].isdisjoint(tokens)}
+            else:
+                ids = set()
+                for token in tokens:
+                    ids.update(postings.get(token, ()))
+                result = ids if result is None else result & ids
+            if not result:
+                break
+        return result or set()
+
+    def search(self, query: str, discipline: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> dict:
+        """Arquivos que contêm todos os termos da busca (E lógico), mais relevantes primeiro.
+
+        Relevância: todos os termos no nome > algum termo só na pasta/notas;
+        empate pela ordem alfabética do nome.
+        """
+        limit = max(1, min(limit, MAX_LIMIT))
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        with self._lock:
+            version = self.version
+            if not terms:
+                return {"query": query, "version": version, "total": 0, "items": []}
+
+            matching = {term: self._matching_tokens(term) for term in terms}
+            result_ids = self._ids_matching_all(terms, 2, matching)
+            docs = self.docs
+            if discipline:
+                result_ids = {i for i in result_ids if docs[i][0] == discipline}
+
+            if self._name_order is None:
+                self._name_order = self._sorted_by_name()
+            order = self._name_order.__getitem__
+
+            in_name = self._ids_matching_all(terms, 3, matching) & result_ids
+            best = heapq.nsmallest(limit, in_name, key=order)
+            if len(best) < limit:
+                best += heapq.nsmallest(limit - len(best), result_ids - in_name, key=order)
+            items = [{"discipline": docs[i][0], **docs[i][1]} for i in best]
+        return {"query": query, "version": version, "total": len(result_ids), "items": items}
@@ -0,0 +1,190 @@
+"""
+Snapshot em memória dos dados do scan, servido direto em bytes pela API
+
+O scanner publica um novo snapshot ao final de cada scan; a troca é uma
+atribuição de referência, então as requisições sempre veem um snapshot
+completo. O JSON e as versões comprimidas (gzip/brotli) são gerados uma única
+vez por scan, e não a cada requisição.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request, Response
+
+from snapshot_format import load_data
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional - sem ele servimos gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+HISTORY_SIZE = 50  # Diffs guardados para /api/files/changes
+SUMMARY_FIELDS = ("name", "path", "folders", "total_files", "total_size", "total_size_bytes")
+EMPTY_PAYLOAD = {"error": "Cache de arquivos ainda não foi criado.", "disciplines": {}}
+
+
+def encode_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class Snapshot:
+    """Dados de um scan com o corpo da resposta já codificado. Não deve ser alterado após criado."""
+
+    __slots__ = ("data", "version", "body", "gzip_body", "br_body", "etag", "last_modified")
+
+    def __init__(self, data: dict, last_modified: Optional[float] = None):
+        self.data = data
+        self.version = data.get("version", 0)
+        self.body = encode_json(data)
+        self.gzip_body = gzip.compress(self.body, compresslevel=GZIP_LEVEL)
+        self.br_body = brotli.compress(self.body, quality=BROTLI_QUALITY) if brotli else None
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        # HTTP-date tem resolução de segundos
+        self.last_modified = int(last_modified if last_modified is not None else time.time())
+
+    def is_not_modified(self, request: Request) -> bool:
+        return is_not_modified(request, self.etag, self.last_modified)
+
+    def to_response(self, request: Request) -> Response:
+        """Resposta HTTP com o corpo pré-codificado (ou 304 se o cliente já tem esta versão)."""
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding, Authorization"
+        }
+        if self.is_not_modified(request):
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        if self.br_body is not None and "br" in accepted:
+            body, headers["Content-Encoding"] = self.br_body, "br"
+        elif "gzip" in accepted:
+            body, headers["Content-Encoding"] = self.gzip_body, "gzip"
+        else:
+            body = self.body
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: int) -> bool:
+    """Avalia If-None-Match (prioritário) e If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def accepted_encodings(header: str) -> set:
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def merge_diffs(diffs) -> dict:
+    """Compõe diffs consecutivos num só: vale a última operação de cada arquivo."""
+    merged = {}
+    for diff in diffs:
+        for disc_key, changes in diff["disciplines"].items():
+            ops = merged.setdefault(disc_key, {})
+            for op in ("added", "modified"):
+                for info in changes[op]:
+                    previous = ops.get(info["id"])
+                    # Adicionado e depois modificado continua sendo novo para o cliente
+                    kept = "added" if previous and previous[0] == "added" else op
+                    ops[info["id"]] = (kept, info)
+            for file_id in changes["removed"]:
+                ops[file_id] = ("removed", file_id)
+
+    result = {}
+    for disc_key, ops in merged.items():
+        bucket = result[disc_key] = {"added": [], "modified": [], "removed": []}
+        for op, value in ops.values():
+            bucket[op].append(value)
+    return result
+
+
+class SnapshotStore:
+    """Guarda o snapshot atual; ``publish`` codifica fora do caminho das requisições e troca a referência."""
+
+    def __init__(self):
+        self._current = Snapshot(EMPTY_PAYLOAD, last_modified=0)
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._publish_lock = threading.Lock()
+
+    @property
+    def current(self) -> Snapshot:
+        return self._current
+
+    def publish(self, data: dict, last_modified: Optional[float] = None, diff: Optional[dict] = None) -> Snapshot:
+        """Publica um novo resultado. ``diff`` (de DriveScanner.last_diff) liga a versão anterior à nova."""
+        snapshot = Snapshot(data, last_modified)
+        with self._publish_lock:
+            previous = self._current
+            if diff is not None and diff["base_version"] == previous.version and diff["version"] == snapshot.version:
+                self._history.append(diff)
+            elif snapshot.version != previous.version:
+                # Sem diff que conecte as versões: clientes antigos recebem o snapshot completo
+                self._history.clear()
+            self._current = snapshot
+        return snapshot
+
+    def changes_since(self, since: int) -> Optional[dict]:
+        """Mudanças de ``since`` até a versão atual, ou None se é preciso o snapshot completo."""
+        with self._publish_lock:
+            current = self._current
+            history = list(self._history)
+        if since == current.version:
+            return {"version": current.version, "full": False, "changes": {}, "summary": {}}
+        if since > current.version:
+            return None
+
+        diffs = [d for d in history if d["base_version"] >= since]
+        if not diffs or diffs[0]["base_version"] != since or diffs[-1]["version"] != current.version:
+            return None
+
+        changes = merge_diffs(diffs)
+        disciplines = current.data.get("disciplines", {})
+        summary = {
+            disc_key: {field: disciplines[disc_key].get(field) for field in SUMMARY_FIELDS}
+            for disc_key in changes if disc_key in disciplines
+        }
+        return {"version": current.version, "full": False, "changes": changes, "summary": summary}
+
+    def load_file(self, path: Path) -> bool:
+        """Carrega o último resultado salvo em disco (usado na inicialização)."""
+        path = Path(path)
+        if not path.exists():
+            return False
+        try:
+            data = load_data(path)
+        except Exception as e:
+            logger.error(f"Erro ao ler cache {path}: {e}")
+            return False
+        self.publish(data, last_modified=path.stat().st_mtime)
+        return True
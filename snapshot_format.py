@@ -0,0 +1,322 @@
+"""
+Formato compacto do snapshot em disco (substitui o file_data.json indentado)
+
+Uma linha JSON por registro lógico:
+
+    {"format": "hdam-snapshot", "format_version": 1, "scan_version": 12, ...}   <- cabeçalho
+    {"d": "structure", "n": 1000, "paths": [...], "c": {...}, "o": {...}}       <- bloco colunar
+    ...
+    {"disciplines": {"structure": {"name": ..., "path": ..., "folders": [...]}}} <- rodapé
+
+Cada bloco guarda as colunas de até N arquivos de uma disciplina. Campos que
+podem ser derivados (type, size, modified, full_path, hash) não são gravados;
+quando o valor real difere do derivado, ele vai em ``o`` (overrides esparsos
+por índice). As pastas são internadas numa tabela por bloco. O cabeçalho na
+primeira linha permite ler a versão sem carregar o resto do arquivo; ele tem
+tamanho fixo (HEADER_SIZE) para poder ser preenchido depois dos blocos.
+
+Os blocos podem ser escritos enquanto o scan ainda está em andamento, na ordem
+em que os arquivos chegam ("sorted": false no cabeçalho); o loader ordena.
+
+A escrita é atômica: arquivo temporário no mesmo diretório + os.replace.
+"""
+
+import json
+import mmap
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional - sem ele usamos o json da stdlib
+    orjson = None
+
+FORMAT_NAME = "hdam-snapshot"
+FORMAT_VERSION = 1
+CHUNK_SIZE = 5000
+HEADER_SIZE = 512
+
+COLUMNS = ("id", "name", "size_bytes", "modified_timestamp")
+# Ordem dos campos no registro da API (a mesma do DriveScanner.build_file_info)
+RECORD_FIELDS = ("id", "name", "type", "size", "size_bytes", "modified",
+                 "modified_timestamp", "path", "full_path", "hash")
+SUMMARY_FIELDS = ("name", "path", "folders")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def format_size(size_bytes) -> str:
+    size_bytes = float(size_bytes or 0)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f}{unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f}TB"
+
+
+def drive_view_url(file_id: str) -> str:
+    """Link padrão (webViewLink) de um arquivo do Drive."""
+    return f"https://drive.google.com/file/d/{file_id}/view?usp=drivesdk"
+
+
+def derive(field: str, info: dict):
+    """Valor padrão de um campo derivável a partir das colunas gravadas."""
+    if field == "type":
+        return info["name"].split('.')[-1].lower()
+    if field == "size":
+        return format_size(info["size_bytes"])
+    if field == "modified":
+        return datetime.fromtimestamp(info["modified_timestamp"], tz=timezone.utc).strftime("%Y-%m-%d")
+    if field == "full_path":
+        return drive_view_url(info['id'])
+    return None  # hash
+
+
+DERIVED_FIELDS = ("type", "size", "modified", "full_path", "hash")
+
+
+def encode_chunk(disc_key: str, files: List[dict]) -> dict:
+    columns = {name: [] for name in COLUMNS}
+    paths, path_ids, path_column = [], {}, []
+    overrides: Dict[str, Dict[str, object]] = {}
+
+    for i, info in enumerate(files):
+        for name in COLUMNS:
+            columns[name].append(info[name])
+        path = info.get("path", "")
+        if path not in path_ids:
+            path_ids[path] = len(paths)
+            paths.append(path)
+        path_column.append(path_ids[path])
+
+        for field in DERIVED_FIELDS:
+            value = info.get(field)
+            if value != derive(field, info):
+                overrides.setdefault(field, {})[str(i)] = value
+        for field, value in info.items():
+            # Campos extras (ex.: notes) vão esparsos, na ordem em que aparecem
+            if field not in RECORD_FIELDS:
+                overrides.setdefault(field, {})[str(i)] = value
+
+    columns["path"] = path_column
+    chunk = {"d": disc_key, "n": len(files), "paths": paths, "c": columns}
+    if overrides:
+        chunk["o"] = overrides
+    return chunk
+
+
+def _modified_column(timestamps: List[float]) -> List[str]:
+    # Muitos arquivos compartilham o dia: formata cada dia (UTC) uma vez só
+    days: Dict[int, str] = {}
+    column = []
+    for ts in timestamps:
+        day = int(ts // 86400)
+        text = days.get(day)
+        if text is None:
+            text = days[day] = derive("modified", {"modified_timestamp": ts})
+        column.append(text)
+    return column
+
+
+def decode_chunk(chunk: dict) -> List[dict]:
+    columns = chunk["c"]
+    ids, names = columns["id"], columns["name"]
+    sizes, timestamps = columns["size_bytes"], columns["modified_timestamp"]
+    paths = chunk["paths"]
+
+    files = [
+        {"id": file_id, "name": name, "type": name.split('.')[-1].lower(), "size": format_size(size),
+         "size_bytes": size, "modified": modified, "modified_timestamp": ts, "path": paths[path],
+         "full_path": drive_view_url(file_id), "hash": None}
+        for file_id, name, size, ts, modified, path in zip(
+            ids, names, sizes, timestamps, _modified_column(timestamps), columns["path"])
+    ]
+    # Overrides substituem o valor derivado (mantendo a ordem dos campos) ou
+    # acrescentam campos extras no fim do registro
+    for field, values in chunk.get("o", {}).items():
+        for i, value in values.items():
+            files[int(i)][field] = value
+    return files
+
+
+class SnapshotWriter:
+    """Escreve o snapshot num arquivo temporário; ``commit`` faz a troca atômica.
+    
+    ``add_file`` aceita registros aos poucos, de qualquer disciplina: cada
+    disciplina vira um bloco assim que junta CHUNK_SIZE arquivos, então o
+    escritor não guarda mais que um bloco por disciplina.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(b" " * (HEADER_SIZE - 1) + b"\n")  # Reservado para o cabeçalho
+        self._buffers: Dict[str, List[dict]] = {}
+        self.streamed = 0
+
+    def _write(self, obj):
+        self._file.write(dumps(obj))
+        self._file.write(b"\n")
+
+    def add_file(self, disc_key: str, info: dict):
+        buffer = self._buffers.setdefault(disc_key, [])
+        buffer.append(info)
+        self.streamed += 1
+        if len(buffer) >= CHUNK_SIZE:
+            self._write(encode_chunk(disc_key, buffer))
+            self._buffers[disc_key] = []
+
+    def write_files(self, disc_key: str, files: List[dict]):
+        for start in range(0, len(files), CHUNK_SIZE):
+            self._write(encode_chunk(disc_key, files[start:start + CHUNK_SIZE]))
+
+    def commit(self, data: dict):
+        """Fecha o snapshot com o resultado final do scan (formato da API).
+        
+        Se nenhum registro veio por ``add_file`` (ex.: scan incremental), os
+        arquivos de ``data`` são escritos agora, já ordenados.
+        """
+        streamed = self.streamed > 0
+        disciplines = data.get("disciplines", {})
+        if streamed:
+            for disc_key, buffer in self._buffers.items():
+                if buffer:
+                    self._write(encode_chunk(disc_key, buffer))
+        else:
+            for disc_key, disc in disciplines.items():
+                self.write_files(disc_key, disc.get("files", []))
+        self._write({"disciplines": {
+            disc_key: {field: disc.get(field) for field in SUMMARY_FIELDS}
+            for disc_key, disc in disciplines.items()
+        }})
+
+        header = dumps({
+            "format": FORMAT_NAME,
+            "format_version": FORMAT_VERSION,
+            "scan_version": data.get("version", 0),
+            "last_scan": data.get("last_scan"),
+            "sorted": not streamed
+        })
+        if len(header) >= HEADER_SIZE:
+            raise ValueError("Cabeçalho do snapshot maior que HEADER_SIZE")
+        self._file.seek(0)
+        self._file.write(header.ljust(HEADER_SIZE - 1) + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+def write_snapshot(path: Path, data: dict):
+    """Grava o resultado de um scan (formato da API) no formato compacto."""
+    writer = SnapshotWriter(path)
+    try:
+        writer.commit(data)
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def read_header(path: Path) -> Optional[dict]:
+    """Lê só o cabeçalho (versão do scan) sem carregar o snapshot.
+    
+    Usa mmap: só as páginas do início do arquivo são lidas do disco/cache.
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.find(b"\n")
+            header = loads(mm[:end if end >= 0 else len(mm)])
+    except (OSError, ValueError):
+        return None
+    return header if header.get("format") == FORMAT_NAME else None
+
+
+class CompactSnapshot:
+    """Snapshot carregado em colunas; ``discipline`` monta (e guarda) os registros da API.
+
+    Hoje todos os leitores (``load_data``, SnapshotStore, índices) pedem o
+    resultado completo via ``to_dict``: o ganho do formato é o tamanho em
+    disco, não o tempo de carga, que fica próximo ao do JSON legado.
+    """
+
+    def __init__(self, header: dict, chunks: List[dict], footer: dict):
+        self.header = header
+        self.footer = footer
+        self.version = header.get("scan_version", 0)
+        self._chunks: Dict[str, List[dict]] = {}
+        for chunk in chunks:
+            self._chunks.setdefault(chunk["d"], []).append(chunk)
+        self._disciplines: Dict[str, dict] = {}
+
+    def discipline(self, disc_key: str) -> dict:
+        if disc_key not in self._disciplines:
+            files = []
+            for chunk in self._chunks.get(disc_key, []):
+                files.extend(decode_chunk(chunk))
+            if not self.header.get("sorted", True):
+                # Escrito durante o scan, na ordem de chegada: mesma ordem do DriveScanner
+                files.sort(key=lambda f: (f["path"], f["name"]))
+            total_size = sum(f["size_bytes"] for f in files)
+            summary = self.footer["disciplines"][disc_key]
+            self._disciplines[disc_key] = {
+                "name": summary["name"],
+                "path": summary["path"],
+                "files": files,
+                "folders": summary["folders"],
+                "total_files": len(files),
+                "total_size": format_size(total_size),
+                "total_size_bytes": total_size
+            }
+        return self._disciplines[disc_key]
+
+    def to_dict(self) -> dict:
+        """Resultado completo no formato da API (/api/files)."""
+        return {
+            "last_scan": self.header.get("last_scan"),
+            "disciplines": {key: self.discipline(key) for key in self.footer["disciplines"]},
+            "version": self.version
+        }
+
+
+def parse_lines(lines: Iterable[bytes]) -> CompactSnapshot:
+    lines = [line for line in lines if line.strip()]
+    header = loads(lines[0])
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError("Arquivo não está no formato hdam-snapshot")
+    if header.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Versão de formato não suportada: {header['format_version']}")
+    return CompactSnapshot(header, [loads(line) for line in lines[1:-1]], loads(lines[-1]))
+
+
+def load_snapshot(path: Path) -> CompactSnapshot:
+    with open(path, "rb") as f:
+        return parse_lines(f)
+
+
+def load_data(path: Path) -> dict:
+    """Carrega um snapshot em disco no formato da API; aceita também o JSON legado."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw.startswith(b'{"format"'):
+        return parse_lines(raw.split(b"\n")).to_dict()
+    return loads(raw)
@@ -0,0 +1,105 @@
+"""
+Arquivos estáticos do dashboard (index.html, login.html, *.js, assets/)
+
+Os arquivos são lidos uma vez na inicialização: corpo em memória, ETag pelo
+hash do conteúdo e, para texto, versões gzip/brotli pré-comprimidas. Cada
+requisição é só uma busca num dicionário (sem stat/open) e responde 304 se o
+navegador já tem a versão atual.
+
+Só o que está na lista (STATIC_PATTERNS) é servido: arquivos de estado e
+credenciais do diretório da aplicação nunca saem pela rota estática. Caminhos
+desconhecidos recebem o index.html (SPA), como antes.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from snapshot import accepted_encodings, is_not_modified, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional - sem ele servimos gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = Path(__file__).parent
+STATIC_PATTERNS = ("*.html", "*.js", "*.css", "assets/*")
+INDEX = "index.html"
+ALIASES = {"": INDEX, "/": INDEX, "login": "login.html", "login/": "login.html"}
+COMPRESSIBLE = {".html", ".js", ".css", ".svg", ".json", ".txt"}
+# Sem hash no nome do arquivo: HTML/JS sempre revalidam (304 barato); imagens ficam um dia em cache
+CACHE_CONTROL = {".html": "no-cache", ".js": "no-cache", ".css": "no-cache"}
+DEFAULT_CACHE_CONTROL = "public, max-age=86400"
+
+
+class StaticAsset:
+    """Um arquivo estático pronto para servir. Não deve ser alterado após criado."""
+
+    __slots__ = ("media_type", "body", "gzip_body", "br_body", "etag", "last_modified", "cache_control")
+
+    def __init__(self, path: Path):
+        self.body = path.read_bytes()
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        self.last_modified = int(path.stat().st_mtime)
+        suffix = path.suffix.lower()
+        self.cache_control = CACHE_CONTROL.get(suffix, DEFAULT_CACHE_CONTROL)
+        self.gzip_body = self.br_body = None
+        if suffix in COMPRESSIBLE:
+            # Só guarda a versão comprimida se ela for menor
+            compressed = gzip.compress(self.body, compresslevel=GZIP_LEVEL)
+            self.gzip_body = compressed if len(compressed) < len(self.body) else None
+            if brotli is not None:
+                compressed = brotli.compress(self.body, quality=BROTLI_QUALITY)
+                self.br_body = compressed if len(compressed) < len(self.body) else None
+
+    def to_response(self, request: Request) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": self.cache_control,
+        }
+        if self.gzip_body is not None or self.br_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if is_not_modified(request, self.etag, self.last_modified):
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        if self.br_body is not None and "br" in accepted:
+            body, headers["Content-Encoding"] = self.br_body, "br"
+        elif self.gzip_body is not None and "gzip" in accepted:
+            body, headers["Content-Encoding"] = self.gzip_body, "gzip"
+        else:
+            body = self.body
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+class StaticFiles:
+    """Arquivos de STATIC_PATTERNS carregados em memória, por caminho relativo."""
+
+    def __init__(self, root: Path = STATIC_ROOT):
+        self.root = Path(root)
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self):
+        assets = {}
+        for pattern in STATIC_PATTERNS:
+            for path in self.root.glob(pattern):
+                if path.is_file():
+                    assets[path.relative_to(self.root).as_posix()] = StaticAsset(path)
+        self.assets = assets
+        total = sum(len(asset.body) for asset in assets.values())
+        logger.info(f"{len(assets)} arquivos estáticos carregados ({total / 1024:.0f}KB)")
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        """Arquivo do caminho pedido, ou o index.html (SPA) se não houver."""
+        path = ALIASES.get(path, path)
+        return self.assets.get(path) or self.assets.get(INDEX)
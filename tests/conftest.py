@@ -0,0 +1,41 @@
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from drive_scanner import DriveScanner, DEFAULT_CONFIG  # noqa: E402
+from fake_drive import FakeDriveService, generate_tree  # noqa: E402
+
+ROOT_ID = "root"
+
+
+@pytest.fixture
+def drive_service():
+    """Drive fake pequeno e determinístico (~300 arquivos em 13 pastas)."""
+    return FakeDriveService(generate_tree(depth=2, fanout=3, files_per_folder=25, root_id=ROOT_ID))
+
+
+@pytest.fixture
+def make_scanner(tmp_path):
+    def make(service, **overrides):
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config.update({
+            "notes_file": str(tmp_path / "file_notes.json"),
+            "state_file": str(tmp_path / "drive_state.json"),
+            "folder_hints_file": str(tmp_path / "folder_hints.json"),
+            "max_workers": 2,
+        })
+        config.update(overrides)
+        scanner = DriveScanner(None, config=config, service=service)
+        scanner.root_folder_id = ROOT_ID
+        return scanner
+    return make
+
+
+@pytest.fixture
+def scan_data(drive_service, make_scanner):
+    """Resultado de um scan completo do fake, no formato da API."""
+    return make_scanner(drive_service).run_once(full=True)
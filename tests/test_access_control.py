@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+
+import access_control
+from access_control import AccessControlStore
+
+
+def write_emails(path, emails):
+    path.write_text(json.dumps({"authorized_emails": emails}), encoding="utf-8")
+    # Garante mtime diferente mesmo em sistemas de arquivos com resolução grossa
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_membership_is_normalized(tmp_path):
+    path = tmp_path / "authorized_emails.json"
+    write_emails(path, ["Ana.Silva@Example.com "])
+
+    store = AccessControlStore(path)
+
+    assert "ana.silva@example.com" in store
+    assert " ANA.SILVA@EXAMPLE.COM" in store
+    assert "outra@example.com" not in store
+
+
+def test_external_edit_is_reloaded_after_check(tmp_path, monkeypatch):
+    monkeypatch.setattr(access_control, "CHECK_INTERVAL", 0.0)
+    path = tmp_path / "authorized_emails.json"
+    write_emails(path, ["a@example.com"])
+    revoked = []
+    store = AccessControlStore(path, on_revoke=revoked.append)
+
+    write_emails(path, ["b@example.com"])
+    assert "a@example.com" in store  # Sem check() nada muda
+    store.check()
+
+    assert "b@example.com" in store
+    assert "a@example.com" not in store
+    assert revoked == [{"a@example.com"}]
+
+
+def test_check_is_throttled(tmp_path, monkeypatch):
+    monkeypatch.setattr(access_control, "CHECK_INTERVAL", 3600.0)
+    path = tmp_path / "authorized_emails.json"
+    write_emails(path, ["a@example.com"])
+    store = AccessControlStore(path)
+    store.check()
+
+    write_emails(path, ["b@example.com"])
+    store.check()
+
+    assert "b@example.com" not in store
+
+
+def test_invalid_file_keeps_last_good_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(access_control, "CHECK_INTERVAL", 0.0)
+    path = tmp_path / "authorized_emails.json"
+    write_emails(path, ["a@example.com"])
+    store = AccessControlStore(path)
+
+    path.write_text("{quebrado", encoding="utf-8")
+    store.check()
+
+    assert "a@example.com" in store
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    path = tmp_path / "authorized_emails.json"
+    write_emails(path, [])
+    # Dois stores simulam dois workers gravando o mesmo arquivo
+    stores = [AccessControlStore(path), AccessControlStore(path)]
+
+    def add(store, start):
+        for i in range(start, start + 20):
+            store.update(lambda emails, i=i: emails + [f"user{i}@example.com"])
+
+    threads = [threading.Thread(target=add, args=(store, n * 20)) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = json.loads(path.read_text(encoding="utf-8"))["authorized_emails"]
+    assert sorted(saved) == sorted(f"user{i}@example.com" for i in range(40))
+    assert not path.with_name(path.name + ".tmp").exists()
+
+
+def test_update_revokes_removed_emails(tmp_path):
+    path = tmp_path / "authorized_emails.json"
+    write_emails(path, ["a@example.com", "b@example.com"])
+    revoked = []
+    store = AccessControlStore(path, on_revoke=revoked.append)
+
+    store.update(lambda emails: [e for e in emails if e != "a@example.com"])
+
+    assert revoked == [{"a@example.com"}]
+    assert store.emails == ["b@example.com"]
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from auth import AuthManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    path = tmp_path / "authorized_emails.json"
+    path.write_text(json.dumps({"authorized_emails": ["ana@example.com"]}), encoding="utf-8")
+    return AuthManager(str(path))
+
+
+def test_stream_ticket_is_single_use(manager):
+    ticket = manager.create_stream_ticket({"email": "ana@example.com"})
+
+    assert manager.redeem_stream_ticket(ticket)["email"] == "ana@example.com"
+    with pytest.raises(HTTPException) as exc:
+        manager.redeem_stream_ticket(ticket)
+    assert exc.value.status_code == 401
+
+
+def test_stream_ticket_and_access_token_are_not_interchangeable(manager):
+    ticket = manager.create_stream_ticket({"email": "ana@example.com"})
+    access_token = manager.create_access_token({"email": "ana@example.com"})
+
+    with pytest.raises(HTTPException):
+        manager.verify_token(ticket)
+    with pytest.raises(HTTPException):
+        manager.redeem_stream_ticket(access_token)
+    assert manager.verify_token(access_token)["email"] == "ana@example.com"
+
+
+def test_stream_ticket_of_removed_email_is_refused(manager):
+    ticket = manager.create_stream_ticket({"email": "ana@example.com"})
+    manager.remove_authorized_email("ana@example.com")
+
+    with pytest.raises(HTTPException) as exc:
+        manager.redeem_stream_ticket(ticket)
+    assert exc.value.status_code == 403
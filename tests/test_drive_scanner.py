@@ -0,0 +1,115 @@
+from fake_drive import FOLDER_MIME_TYPE
+
+
+def comparable(data):
+    """Resultado sem o que varia entre execuções (horário e versão)."""
+    return {key: disc for key, disc in data["disciplines"].items()}
+
+
+def folder_ids(service, parent=None):
+    return sorted(item["id"] for item in service.items.values()
+                  if item["mimeType"] == FOLDER_MIME_TYPE and (parent is None or item["parents"] == [parent]))
+
+
+def file_ids(service, parent):
+    return sorted(item["id"] for item in service.items.values()
+                  if item["mimeType"] != FOLDER_MIME_TYPE and item["parents"] == [parent]
+                  and item["name"].endswith((".pdf", ".dwg")))
+
+
+def new_file(file_id, name, parent):
+    return {"id": file_id, "name": name, "mimeType": "application/pdf", "modifiedTime": "2025-06-01T00:00:00.000Z",
+            "size": "1234", "webViewLink": f"https://drive.google.com/file/d/{file_id}/view?usp=drivesdk",
+            "parents": [parent]}
+
+
+def test_incremental_matches_full_scan(drive_service, make_scanner, tmp_path):
+    scanner = make_scanner(drive_service)
+    scanner.run_once(full=True)
+    top = folder_ids(drive_service, "root")
+    arq, est, hid = top[:3]
+    arq_sub, est_sub = folder_ids(drive_service, arq), folder_ids(drive_service, est)
+
+    steps = [
+        # Renomear e mover arquivos, adicionar e remover
+        lambda s: s.update_item(file_ids(s, arq_sub[0])[0], name="EST-RENOMEADO-R00.pdf"),
+        lambda s: s.update_item(file_ids(s, arq_sub[0])[1], parents=[est_sub[1]]),
+        lambda s: s.add_item(new_file("fnovo1", "HID-NOVO-R00.dwg", hid)),
+        lambda s: s.remove_item(file_ids(s, est_sub[0])[0]),
+        # Pastas: renomear (muda a dica de disciplina), mover com subárvore e remover
+        lambda s: s.update_item(arq_sub[1], name="ESTRUTURA AUXILIAR"),
+        lambda s: s.update_item(est_sub[2], parents=[hid]),
+        lambda s: s.remove_item(arq_sub[2]),
+        # Pasta nova cujo arquivo chega no mesmo lote, antes dela
+        lambda s: (s.add_item(new_file("fnovo2", "ARQ-NOVO-R01.pdf", "dnova")),
+                   s.add_item({"id": "dnova", "name": "PAVIMENTO 09", "mimeType": FOLDER_MIME_TYPE,
+                               "parents": [arq]})),
+    ]
+    for i, step in enumerate(steps):
+        step(drive_service)
+        incremental = scanner.run_once(full=False)
+        full = make_scanner(drive_service, state_file=str(tmp_path / f"full_{i}.json"),
+                            folder_hints_file=str(tmp_path / f"hints_{i}.json")).run_once(full=True)
+        assert comparable(incremental) == comparable(full), f"passo {i}"
+        assert scanner.last_diff is not None
+
+
+def test_listing_error_forces_next_full_scan(drive_service, make_scanner):
+    scanner = make_scanner(drive_service)
+    broken = folder_ids(drive_service, "root")[0]
+    list_entries = scanner.backend.list_entries
+
+    def failing(folder_id):
+        if folder_id == broken:
+            raise RuntimeError("HTTP 500")
+        return list_entries(folder_id)
+
+    scanner.backend.list_entries = failing
+    scanner.run_once(full=True)
+    assert scanner.progress["listing_errors"] == 1
+    assert scanner.needs_full_scan()
+
+    scanner.backend.list_entries = list_entries
+    scanner.run_once()
+    assert scanner.progress["mode"] == "full"
+    assert not scanner.needs_full_scan()
+
+
+def test_full_scans_reuse_saved_classification(drive_service, make_scanner):
+    scanner = make_scanner(drive_service)
+    first = scanner.run_once(full=True)
+    assert scanner.progress["files_classified"] > 0
+
+    scanner.run_once(full=True)
+    assert scanner.progress["files_classified"] == 0
+
+    # Reinício: a classificação vem do estado salvo
+    restarted = make_scanner(drive_service)
+    data = restarted.run_once(full=True)
+    assert restarted.progress["files_classified"] == 0
+    assert comparable(data) == comparable(first)
+
+    file_id = file_ids(drive_service, folder_ids(drive_service, "root")[0])[0]
+    drive_service.update_item(file_id, name="HID-RENOMEADO-R00.pdf")
+    restarted.run_once(full=True)
+    assert restarted.progress["files_classified"] == 1
+
+
+def test_saved_classification_is_dropped_when_keywords_change(drive_service, make_scanner):
+    make_scanner(drive_service).run_once(full=True)
+
+    scanner = make_scanner(drive_service)
+    scanner.classifier.signature = "outras palavras-chave"
+    scanner.run_once(full=True)
+
+    assert scanner.progress["files_classified"] == len(scanner.index["files"])
+
+
+def test_discipline_folders_are_first_level(drive_service, make_scanner):
+    data = make_scanner(drive_service).run_once(full=True)
+    top_level = {drive_service.items[fid]["name"] for fid in folder_ids(drive_service, "root")}
+
+    for disc in data["disciplines"].values():
+        expected = {info["path"].split("/")[0] for info in disc["files"] if info["path"]}
+        assert disc["folders"] == sorted(expected)
+        assert set(disc["folders"]) <= top_level
@@ -0,0 +1,113 @@
+import pytest
+
+from file_query import DisciplineIndex, FileQueryIndex, QueryError, SORT_KEYS, encode_cursor
+
+
+def all_files(data):
+    return [info for disc in data["disciplines"].values() for info in disc["files"]]
+
+
+def collect_pages(index, **params):
+    """Percorre todas as páginas seguindo next_cursor."""
+    items, cursor, pages = [], None, 0
+    while True:
+        page = index.query(cursor=cursor, **params)
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+@pytest.mark.parametrize("sort", list(SORT_KEYS))
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_the_sorted_list_once(scan_data, sort, order):
+    files = all_files(scan_data)
+    index = DisciplineIndex(files)
+
+    items, pages = collect_pages(index, sort=sort, order=order, limit=7)
+
+    expected = sorted(files, key=SORT_KEYS[sort], reverse=order == "desc")
+    assert [f["id"] for f in items] == [f["id"] for f in expected]
+    assert pages == -(-len(files) // 7)
+
+
+def test_cursor_stays_valid_across_a_new_scan(scan_data):
+    files = sorted(all_files(scan_data), key=SORT_KEYS["name"])
+    first = DisciplineIndex(files).query(sort="name", limit=10)
+    last_seen = first["items"][-1]
+
+    # Novo scan: some um arquivo já entregue e entra um antes do cursor
+    newer = [f for f in files if f["id"] != first["items"][0]["id"]]
+    newer.append({**files[0], "id": "zz-new", "name": "000-novo.pdf"})
+    page = DisciplineIndex(newer).query(sort="name", limit=10, cursor=first["next_cursor"])
+
+    # A página seguinte continua logo depois do último item entregue, sem repetir nem pular
+    remaining = [f for f in sorted(newer, key=SORT_KEYS["name"]) if SORT_KEYS["name"](f) > SORT_KEYS["name"](last_seen)]
+    assert [f["id"] for f in page["items"]] == [f["id"] for f in remaining[:10]]
+
+
+def test_filters_by_type_folder_and_date(scan_data):
+    files = all_files(scan_data)
+    index = DisciplineIndex(files)
+    sample = files[0]
+    folder = sample["path"].split("/")[0]
+
+    items, _ = collect_pages(index, file_type=sample["type"].upper(), folder=folder,
+                             date_from=sample["modified"], date_to=sample["modified"], limit=5)
+
+    expected = {f["id"] for f in files
+                if f["type"] == sample["type"] and (f["path"] == folder or f["path"].startswith(folder + "/"))
+                and f["modified"] == sample["modified"]}
+    assert {f["id"] for f in items} == expected
+    assert sample["id"] in expected
+
+
+def test_date_range_on_date_sort_uses_the_index(scan_data):
+    files = all_files(scan_data)
+    days = sorted({f["modified"] for f in files})
+    start, end = days[len(days) // 4], days[len(days) // 2]
+
+    result = DisciplineIndex(files).query(sort="modified_timestamp", date_from=start, date_to=end, limit=1000)
+
+    expected = [f for f in files if start <= f["modified"] <= end]
+    assert {f["id"] for f in result["items"]} == {f["id"] for f in expected}
+    # Ordenado por data, o intervalo sai de uma busca binária: o total continua grátis
+    assert result["total"] == len(expected)
+
+
+def test_total_without_filters(scan_data):
+    files = all_files(scan_data)
+    assert DisciplineIndex(files).query(limit=1)["total"] == len(files)
+
+
+@pytest.mark.parametrize("params", [{"sort": "size"}, {"order": "up"}, {"cursor": "!!"}, {"date_from": "2025-13-01"}])
+def test_invalid_parameters(scan_data, params):
+    with pytest.raises(QueryError):
+        DisciplineIndex(all_files(scan_data)).query(**params)
+
+
+def test_query_index_by_discipline(scan_data):
+    index = FileQueryIndex()
+    index.publish(scan_data)
+
+    for disc_key, disc in scan_data["disciplines"].items():
+        result = index.query(disc_key, limit=1000)
+        assert result["version"] == scan_data["version"]
+        assert {f["id"] for f in result["items"]} == {f["id"] for f in disc["files"]}
+    assert index.query("inexistente") is None
+
+
+@pytest.mark.parametrize("sort, order", [("size_bytes", "asc"), ("modified_timestamp", "asc"), ("name", "desc")])
+def test_cursor_from_another_sort_is_rejected(scan_data, sort, order):
+    index = DisciplineIndex(all_files(scan_data))
+    cursor = index.query(sort="name", limit=5)["next_cursor"]
+
+    with pytest.raises(QueryError):
+        index.query(sort=sort, order=order, cursor=cursor)
+
+
+def test_forged_cursor_key_is_rejected(scan_data):
+    forged = encode_cursor("size_bytes", "asc", ("texto", "id"))
+    with pytest.raises(QueryError):
+        DisciplineIndex(all_files(scan_data)).query(sort="size_bytes", cursor=forged)
@@ -0,0 +1,77 @@
+import threading
+
+from scan_coordinator import ScanCoordinator
+
+TIMEOUT = 5
+
+
+class BlockingScan:
+    """scan_fn que espera liberação, para segurar um scan em andamento."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Semaphore(0)
+        self.release = threading.Semaphore(0)
+
+    def __call__(self):
+        self.calls += 1
+        self.started.release()
+        assert self.release.acquire(timeout=TIMEOUT)
+
+
+def test_requests_during_a_scan_coalesce_into_one_run():
+    scan = BlockingScan()
+    coordinator = ScanCoordinator(scan)
+    try:
+        first = coordinator.request_scan("startup")
+        assert scan.started.acquire(timeout=TIMEOUT)
+        queued = [coordinator.request_scan(reason) for reason in ("schedule", "refresh", "refresh")]
+
+        status = coordinator.status()
+        assert status["state"] == "running"
+        assert status["queued"] is True
+        assert status["queued_reasons"] == ["schedule", "refresh"]
+        assert status["coalesced_requests"] == 2
+        # Todos os pedidos feitos durante o scan esperam a mesma execução seguinte
+        assert all(future is queued[0] for future in queued)
+        assert queued[0] is not first
+
+        scan.release.release()
+        assert first.result(timeout=TIMEOUT)["reason"] == "startup"
+        assert scan.started.acquire(timeout=TIMEOUT)
+        scan.release.release()
+        assert queued[0].result(timeout=TIMEOUT)["reason"] == "schedule, refresh"
+        assert scan.calls == 2
+        assert coordinator.status()["state"] == "idle"
+    finally:
+        coordinator.shutdown()
+
+
+def test_failed_scan_is_reported_and_next_request_runs():
+    calls = []
+
+    def scan():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("falhou")
+
+    coordinator = ScanCoordinator(scan)
+    try:
+        assert coordinator.request_scan().result(timeout=TIMEOUT)["error"] == "falhou"
+        assert coordinator.request_scan().result(timeout=TIMEOUT)["error"] is None
+        assert coordinator.status()["runs"] == 2
+    finally:
+        coordinator.shutdown()
+
+
+def test_status_includes_progress_of_running_scan():
+    scan = BlockingScan()
+    coordinator = ScanCoordinator(scan, progress_fn=lambda: {"folders_listed": 3})
+    try:
+        future = coordinator.request_scan("manual")
+        assert scan.started.acquire(timeout=TIMEOUT)
+        assert coordinator.status()["current"]["progress"] == {"folders_listed": 3}
+        scan.release.release()
+        future.result(timeout=TIMEOUT)
+    finally:
+        coordinator.shutdown()
@@ -0,0 +1,108 @@
+import threading
+
+from search_index import SearchIndex, normalize_text, tokenize
+
+
+def all_files(data):
+    return [(disc_key, info) for disc_key, disc in data["disciplines"].items() for info in disc["files"]]
+
+
+def search_ids(index, query, **params):
+    return {item["id"] for item in index.search(query, limit=500, **params)["items"]}
+
+
+def brute_force(data, terms):
+    """Arquivos em que cada termo é parte de algum token de nome, pasta ou notas."""
+    found = set()
+    for _, info in all_files(data):
+        tokens = tokenize(f"{info['name']} {info['path']} {info.get('notes') or ''}")
+        if all(any(term in token for token in tokens) if len(term) >= 3 else
+               any(token.startswith(term) for token in tokens) for term in terms):
+            found.add(info["id"])
+    return found
+
+
+def test_normalization():
+    assert normalize_text("Hidráulica ÇÃO") == "hidraulica cao"
+    assert tokenize("EST-00012-R01.pdf") == ["est", "00012", "r01", "pdf"]
+
+
+def test_prefix_and_substring_match(scan_data):
+    index = SearchIndex()
+    index.rebuild(scan_data)
+    _, sample = all_files(scan_data)[0]
+    code = tokenize(sample["name"])[1]  # Número do documento, ex.: "00012"
+
+    assert sample["id"] in search_ids(index, code[:2])   # Prefixo
+    assert sample["id"] in search_ids(index, code[1:])   # Trecho do meio (trigramas)
+    for query in (code[:2], code[1:], "pav 01", "rev"):
+        assert search_ids(index, query) == brute_force(scan_data, tokenize(query))
+
+
+def test_name_matches_rank_first(scan_data):
+    index = SearchIndex()
+    index.rebuild(scan_data)
+    _, sample = all_files(scan_data)[0]
+    prefix = tokenize(sample["name"])[0]
+
+    result = index.search(f"{prefix} pavimento", limit=500)
+
+    # Quem tem todos os termos no nome vem antes de quem tem algum só na pasta
+    in_name = [all(any(t.startswith(term) for t in tokenize(item["name"])) for term in (prefix, "pavimento"))
+               for item in result["items"]]
+    assert in_name == sorted(in_name, reverse=True)
+    assert result["total"] == len(brute_force(scan_data, [prefix, "pavimento"]))
+
+
+def test_discipline_filter(scan_data):
+    index = SearchIndex()
+    index.rebuild(scan_data)
+
+    ids = search_ids(index, "pdf", discipline="structure")
+
+    assert ids == {info["id"] for info in scan_data["disciplines"]["structure"]["files"] if info["type"] == "pdf"}
+
+
+def test_diff_updates_match_a_rebuild(drive_service, make_scanner):
+    scanner = make_scanner(drive_service)
+    index = SearchIndex()
+    index.publish(scanner.run_once(full=True))
+
+    file_ids = [item["id"] for item in drive_service.items.values() if item["name"].endswith((".pdf", ".dwg"))]
+    drive_service.update_item(file_ids[0], name="ARQ-RENOMEADO-R00.pdf")
+    drive_service.remove_item(file_ids[1])
+    data = scanner.run_once()
+    index.publish(data, diff=scanner.last_diff)
+
+    rebuilt = SearchIndex()
+    rebuilt.rebuild(data)
+    assert index.version == data["version"]
+    for query in ("renomeado", "arq", "pdf", "rev01"):
+        assert search_ids(index, query) == search_ids(rebuilt, query)
+    assert file_ids[1] not in index.docs
+
+
+def test_search_is_not_blocked_by_a_rebuild(scan_data):
+    index = SearchIndex()
+    index.rebuild(scan_data)
+    before = search_ids(index, "pdf")
+    started, release = threading.Event(), threading.Event()
+
+    def slow_files():
+        started.set()
+        release.wait(5)
+        yield from scan_data["disciplines"]["structure"]["files"]
+
+    rebuild = threading.Thread(target=index.rebuild, args=(
+        {"version": 99, "disciplines": {"structure": {"files": slow_files()}}},))
+    rebuild.start()
+    try:
+        assert started.wait(5)
+        # A montagem está parada no meio: a busca responde com o índice anterior
+        assert search_ids(index, "pdf") == before
+    finally:
+        release.set()
+        rebuild.join()
+    assert index.version == 99
+    assert search_ids(index, "pdf") == {info["id"] for info in scan_data["disciplines"]["structure"]["files"]
+                                        if info["type"] == "pdf"}
@@ -0,0 +1,84 @@
+from snapshot import SnapshotStore, merge_diffs
+from fake_drive import FOLDER_MIME_TYPE
+
+
+def file_items(service):
+    """Arquivos que entram no resultado do scan (PDF/DWG)."""
+    return [item for item in service.items.values()
+            if item["mimeType"] != FOLDER_MIME_TYPE and item["name"].endswith((".pdf", ".dwg"))]
+
+
+def scan_and_publish(store, scanner):
+    data = scanner.run_once()
+    store.publish(data, diff=scanner.last_diff)
+    return data
+
+
+def test_merge_diffs_keeps_last_operation():
+    first = {"disciplines": {"structure": {
+        "added": [{"id": "a", "v": 1}], "modified": [{"id": "b", "v": 1}], "removed": ["c"]}}}
+    second = {"disciplines": {"structure": {
+        "added": [], "modified": [{"id": "a", "v": 2}], "removed": ["b"]}}}
+
+    merged = merge_diffs([first, second])["structure"]
+
+    # Adicionado e depois modificado continua sendo adição, com o registro mais novo
+    assert merged["added"] == [{"id": "a", "v": 2}]
+    assert merged["modified"] == []
+    assert sorted(merged["removed"]) == ["b", "c"]
+
+
+def test_changes_since_composes_consecutive_scans(drive_service, make_scanner):
+    scanner = make_scanner(drive_service)
+    store = SnapshotStore()
+    base = scanner.run_once(full=True)
+    store.publish(base)
+    base_version = store.current.version
+
+    files = file_items(drive_service)
+    renamed, removed = files[0], files[1]
+    drive_service.update_item(renamed["id"], modifiedTime="2026-01-01T00:00:00.000Z")
+    scan_and_publish(store, scanner)
+    drive_service.remove_item(removed["id"])
+    current = scan_and_publish(store, scanner)
+
+    result = store.changes_since(base_version)
+    assert result["version"] == current["version"] == base_version + 2
+    assert result["full"] is False
+    modified = [info["id"] for changes in result["changes"].values() for info in changes["modified"]]
+    removed_ids = [file_id for changes in result["changes"].values() for file_id in changes["removed"]]
+    assert modified == [renamed["id"]]
+    assert removed_ids == [removed["id"]]
+    # O resumo vem só das disciplinas alteradas
+    assert set(result["summary"]) == set(result["changes"])
+
+
+def test_changes_since_current_version_is_empty(scan_data):
+    store = SnapshotStore()
+    store.publish(scan_data)
+
+    result = store.changes_since(scan_data["version"])
+
+    assert result == {"version": scan_data["version"], "full": False, "changes": {}, "summary": {}}
+
+
+def test_changes_since_without_connecting_diffs_needs_full_snapshot(drive_service, make_scanner):
+    scanner = make_scanner(drive_service)
+    store = SnapshotStore()
+    store.publish(scanner.run_once(full=True))
+    base_version = store.current.version
+    drive_service.remove_item(file_items(drive_service)[0]["id"])
+    # Publicado sem diff: não há como ligar as versões
+    store.publish(scanner.run_once())
+
+    assert store.changes_since(base_version) is None
+    assert store.changes_since(store.current.version + 1) is None
+
+
+def test_unchanged_scan_keeps_version(drive_service, make_scanner):
+    scanner = make_scanner(drive_service)
+    first = scanner.run_once(full=True)
+    second = scanner.run_once()
+
+    assert second["version"] == first["version"]
+    assert scanner.last_diff is None
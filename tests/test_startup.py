@@ -0,0 +1,50 @@
+import importlib
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from snapshot_format import load_data, write_snapshot
+
+
+def totals(data):
+    return {key: disc["total_files"] for key, disc in data["disciplines"].items()}
+
+
+@pytest.fixture
+def app_main(tmp_path, monkeypatch, scan_data):
+    """main.py importado numa pasta com um snapshot salvo e sem credenciais do Drive."""
+    write_snapshot(tmp_path / "file_data.snapshot", scan_data)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GOOGLE_CREDS_JSON", "{}")
+    monkeypatch.setenv("SCAN_LOCK_FILE", str(tmp_path / "scan.lock"))
+    sys.modules.pop("main", None)
+    main = importlib.import_module("main")
+    main.app.dependency_overrides[main.get_current_user] = lambda: {"email": "teste@example.com"}
+    yield main
+    sys.modules.pop("main", None)
+
+
+def test_api_starts_serving_the_saved_snapshot(app_main, scan_data):
+    with TestClient(app_main.app) as client:
+        assert app_main.startup_metrics["ready_seconds"] <= app_main.STARTUP_TARGET_SECONDS
+        files = client.get("/api/files").json()
+
+    assert sum(totals(files).values()) > 0
+    assert totals(files) == totals(scan_data)
+
+
+def test_unavailable_drive_keeps_the_saved_snapshot(app_main, scan_data):
+    with TestClient(app_main.app) as client:
+        deadline = time.monotonic() + 10
+        while app_main.scan_coordinator.runs == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert app_main.scan_coordinator.runs >= 1  # O scan de inicialização já rodou
+
+        status = client.get("/api/status").json()
+        files = client.get("/api/files").json()
+
+    assert status["data_state"] == "stale"
+    assert totals(files) == totals(scan_data)
+    assert load_data("file_data.snapshot")["version"] == scan_data["version"]